@@ -1,7 +1,10 @@
 import streamlit as st
-from database import init_database
+from catalogs import DEFAULT_CATALOG, activate_catalog, load_catalogs
+from database import init_database, read_snapshot, start_page_render
 from utils import load_css
 from init_db import create_placeholder_image, init_sample_data
+from maintenance import start_maintenance_scheduler
+from repository import ItemRepository
 
 # ✅ เปลี่ยนจาก import show มา import ทั้งโมดูล
 import pages.view_items as view_items
@@ -17,10 +20,24 @@ st.set_page_config(
 
 load_css()
 
+repository = ItemRepository()
+
+# ✅ เลือกเกม (แคตตาล็อก) — ทุก query ของ rerun นี้ใช้ไฟล์ฐานข้อมูลของเกมที่เลือก (ดู catalogs.py)
+catalogs = load_catalogs()
+if len(catalogs) > 1:
+    with st.sidebar:
+        selected_catalog = st.selectbox("🎮 เกม", list(catalogs), key="catalog",
+                                        format_func=lambda slug: catalogs[slug].name)
+else:
+    selected_catalog = DEFAULT_CATALOG
+activate_catalog(selected_catalog)
+start_maintenance_scheduler()  # หนึ่งตัวต่อไฟล์ต่อ process เรียกซ้ำจากหลาย session ได้
+
 if 'initialized' not in st.session_state:
     init_database()
     create_placeholder_image()
-    init_sample_data()
+    if selected_catalog == DEFAULT_CATALOG:
+        init_sample_data()
     st.session_state.initialized = True
 
 # ✅ เมนู Sidebar
@@ -34,13 +51,14 @@ with st.sidebar:
         label_visibility="collapsed"
     )
 
-    st.markdown("---")
+    # นับ query ของการ render ครั้งนี้แยกตามหน้า (ดูสรุปได้จาก database.get_query_stats)
+    start_page_render(menu)
 
-    # แสดงสถิติด้านข้าง
-    from database import execute_query
+    st.markdown("---")
 
-    count = execute_query("SELECT COUNT(*) as count FROM items WHERE name NOT LIKE '[%]%'")
-    total_items = count[0]['count'] if count else 0
+    # แสดงสถิติด้านข้าง (อ่านจากตาราง item_stats ครั้งเดียวต่อการ rerun)
+    stats = repository.stats()
+    total_items = stats['total']
     st.markdown(f"**📊 ไอเท็ม:** {total_items} ชิ้น")
 
 # ✅ หน้าหลัก
@@ -67,13 +85,9 @@ if menu == "🏠 หน้าหลัก":
     ### 📊 สถิติ
     """)
 
-    from database import execute_query
-
-    count = execute_query("SELECT COUNT(*) as count FROM items WHERE name NOT LIKE '[%]%'")[0]['count']
-    legendary = \
-    execute_query("SELECT COUNT(*) as count FROM items WHERE rarity = 'Legendary' AND name NOT LIKE '[%]%'")[0]['count']
-    epic = execute_query("SELECT COUNT(*) as count FROM items WHERE rarity = 'Epic' AND name NOT LIKE '[%]%'")[0][
-        'count']
+    count = stats['total']
+    legendary = stats['rarity'].get('Legendary', 0)
+    epic = stats['rarity'].get('Epic', 0)
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -88,7 +102,9 @@ if menu == "🏠 หน้าหลัก":
 
 # ✅ เรียกหน้าที่เลือก
 elif menu == "🔍 ค้นหาไอเท็ม":
-    view_items.show()
+    # หน้าค้นหาอ่านอย่างเดียว: อ่านจาก snapshot ใน memory แทนไฟล์ (ดู database.read_snapshot)
+    with read_snapshot():
+        view_items.show()
 elif menu == "📝 จัดการไอเท็ม":
     manage_items.show()
 elif menu == "⚙️ ADMIN":
@@ -0,0 +1,110 @@
+"""ชั้นเข้าถึงข้อมูลแบบ asyncio
+
+งาน SQLite ทั้งหมดยังเป็นแบบ blocking จึงถูกส่งไปรันบน thread pool ที่จำกัดขนาด
+(ไม่เกินจำนวน connection ใน pool ของ database.py) เพื่อไม่ให้ event loop ค้าง
+sqlite3 ปล่อย GIL ระหว่างรัน statement ทำให้ query ที่ไม่ขึ้นต่อกันรันพร้อมกันได้จริง
+ด้วย asyncio.gather
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from repository import ItemFilter, ItemRepository
+
+MAX_WORKERS = database.POOL_SIZE  # แต่ละ worker ยืม connection ของตัวเองจาก pool
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """thread pool ที่ใช้รันงานฐานข้อมูล (สร้างครั้งแรกที่เรียกใช้)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="item-wiki-db")
+    return _executor
+
+
+def shutdown_executor(wait=True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def _call_with_db_path(path, call_site, func, args, kwargs):
+    with database.use_db_path(path), database.use_call_site(call_site):
+        return func(*args, **kwargs)
+
+
+async def run_in_db(func, *args, **kwargs):
+    """รันฟังก์ชันฐานข้อมูลแบบ blocking บน executor แล้วรอผลแบบ async
+
+    worker ใช้ไฟล์ฐานข้อมูลเดียวกับผู้เรียก (เช่นแคตตาล็อกของ session ที่เลือกไว้ด้วย use_db_path)
+    และ query log รายงานจุดที่เรียกของผู้เรียก ไม่ใช่ frame ของ executor
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_call_with_db_path, database.get_db_path(), database._call_site(),
+                             func, args, kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+async def execute_query_async(query, params=(), fetch_one=False):
+    """execute_query แบบ async"""
+    return await run_in_db(database.execute_query, query, params, fetch_one)
+
+
+async def get_filter_options_async():
+    """โหลด master data ทั้ง 4 หมวดพร้อมกัน (คู่กับ utils.get_filter_options)"""
+    types, rarities, locations, tiers = await asyncio.gather(*(
+        run_in_db(database.get_master_data, category)
+        for category in ('type', 'rarity', 'location', 'tier')
+    ))
+    return (
+        [row['value'] for row in types],
+        [row['value'] for row in rarities],
+        [row['value'] for row in locations],
+        [row['value'] for row in tiers],
+    )
+
+
+class AsyncItemRepository:
+    """ItemRepository แบบ async — ทุกเมธอดรันบน executor"""
+
+    def __init__(self, repository=None):
+        self._repository = repository or ItemRepository()
+
+    async def get(self, item_id):
+        return await run_in_db(self._repository.get, item_id)
+
+    async def count(self, item_filter=ItemFilter()):
+        return await run_in_db(self._repository.count, item_filter)
+
+    async def list_page(self, item_filter=ItemFilter(), cursor=None, backward=False):
+        return await run_in_db(self._repository.list_page, item_filter, cursor, backward)
+
+    async def list_all(self, item_filter=ItemFilter()):
+        return await run_in_db(self._repository.list_all, item_filter)
+
+    async def stats(self):
+        return await run_in_db(self._repository.stats)
+
+    async def name_exists(self, name, exclude_id=None):
+        return await run_in_db(self._repository.name_exists, name, exclude_id)
+
+    async def add(self, item):
+        return await run_in_db(self._repository.add, item)
+
+    async def add_many(self, items):
+        return await run_in_db(self._repository.add_many, items)
+
+    async def update(self, item):
+        return await run_in_db(self._repository.update, item)
+
+    async def delete(self, item_id):
+        return await run_in_db(self._repository.delete, item_id)
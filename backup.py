@@ -0,0 +1,227 @@
+"""สำรองฐานข้อมูลขณะแอปทำงานอยู่ ด้วย online backup API ของ SQLite
+
+คัดลอกทีละ BACKUP_PAGES_PER_STEP หน้า และพัก BACKUP_STEP_SLEEP วินาทีระหว่างขั้น
+connection ต้นทางถือ read transaction ตลอดการสำรอง ได้สำเนาที่สอดคล้องกัน ณ เวลาเริ่ม
+และการเขียนจาก session อื่นไม่ทำให้ต้องเริ่มคัดลอกใหม่ (WAL: ผู้อ่านและผู้เขียนไม่ถูกบล็อก
+มีเพียง checkpoint ที่เลื่อนออกไปจนกว่าจะสำรองเสร็จ)
+
+ไฟล์สำรองชื่อ <ชื่อฐานข้อมูล>-<YYYYmmdd-HHMMSS>.db (หรือ .db.gz เมื่อบีบอัด) ใน BACKUP_DIR
+ถ้าสำรองซ้ำในวินาทีเดียวกัน ไฟล์ถัดไปต่อท้ายด้วย -1, -2, ...
+
+รัน:  python backup.py --gzip --keep 10
+      python backup.py --list
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import count
+
+import database
+
+BACKUP_DIR = "backups"
+BACKUP_PAGES_PER_STEP = 256   # หน้าต่อขั้น (หน้าละ 4 KB โดยปกติ)
+BACKUP_STEP_SLEEP = 0.005     # วินาทีที่พักระหว่างขั้น ให้ I/O ของ session อื่นแทรกได้
+
+_STAMP_FORMAT = "%Y%m%d-%H%M%S"
+_BACKUP_NAME = re.compile(r"^(?P<prefix>.+)-(?P<stamp>\d{8}-\d{6})(?:-(?P<seq>\d+))?\.db(?P<gz>\.gz)?$")
+
+
+@dataclass
+class BackupProgress:
+    """ความคืบหน้าระหว่างสำรอง (ส่งให้ progress callback หลังแต่ละขั้น)"""
+    copied_pages: int
+    total_pages: int
+    page_size: int
+    elapsed: float
+
+    @property
+    def fraction(self):
+        return min(1.0, self.copied_pages / self.total_pages) if self.total_pages else 1.0
+
+    @property
+    def bytes_per_second(self):
+        return self.copied_pages * self.page_size / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class BackupFile:
+    """ไฟล์สำรองหนึ่งไฟล์ใน BACKUP_DIR"""
+    path: str
+    created: datetime
+    size: int
+    compressed: bool
+    seq: int = 0
+
+
+@dataclass
+class BackupResult:
+    """ผลของ backup_database (size: ขนาดไฟล์หลังบีบอัด, removed: ไฟล์เก่าที่ถูกลบตามนโยบายการเก็บ)"""
+    path: str
+    size: int
+    pages: int
+    page_size: int
+    seconds: float
+    removed: list
+
+    @property
+    def bytes_per_second(self):
+        """อัตราคัดลอกฐานข้อมูล (รวมเวลาบีบอัด)"""
+        return self.pages * self.page_size / self.seconds if self.seconds else 0.0
+
+
+def _prefix(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0] or "item_wiki"
+
+
+def _reserve_path(backup_dir, prefix):
+    """จองชื่อไฟล์ที่ยังไม่ถูกใช้ด้วยการสร้างไฟล์ .partial แบบ exclusive คืนค่า (path, partial)
+
+    กันการสำรองสองครั้งในวินาทีเดียวกัน (จาก session หรือ process อื่น) เขียนทับกัน
+    """
+    base = os.path.join(backup_dir, f"{prefix}-{datetime.now().strftime(_STAMP_FORMAT)}")
+    for seq in count():
+        path = f"{base}-{seq}.db" if seq else f"{base}.db"
+        if os.path.exists(path) or os.path.exists(path + ".gz"):
+            continue
+        try:
+            open(path + ".partial", 'x').close()
+        except FileExistsError:
+            continue
+        return path, path + ".partial"
+
+
+def _copy(source_path, target_path, pages_per_step, step_sleep, progress):
+    """คัดลอกด้วย backup API คืนค่า (จำนวนหน้าทั้งหมด, ขนาดหน้า)"""
+    uri = source_path.startswith("file:")
+    source = sqlite3.connect(source_path, uri=uri, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    started = time.perf_counter()
+    page_size = source.execute("PRAGMA page_size").fetchone()[0]
+    total = [0]
+
+    def step(status, remaining, pages):
+        total[0] = pages
+        if progress is not None:
+            progress(BackupProgress(pages - remaining, pages, page_size, time.perf_counter() - started))
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    try:
+        # เปิด read transaction ค้างไว้: backup อ่านจาก snapshot นี้ จึงไม่เริ่มใหม่เมื่อมีการเขียน
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_schema").fetchone()
+        source.backup(target, pages=pages_per_step, progress=step)
+        source.execute("COMMIT")
+        # ไฟล์สำรองเป็นไฟล์เดียว ไม่มี -wal ตามมา
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+    return total[0], page_size
+
+
+def _gzip(path):
+    with open(path, 'rb') as src, gzip.open(path + ".gz", 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.remove(path)
+    return path + ".gz"
+
+
+def backup_database(db_path=None, backup_dir=None, compress=False, keep_last=None, max_age_days=None,
+                    pages_per_step=None, step_sleep=None, progress=None):
+    """สำรองฐานข้อมูลเป็นไฟล์ใหม่ใน backup_dir แล้วลบไฟล์เก่าตามนโยบายการเก็บ คืนค่า BackupResult
+
+    progress(BackupProgress) ถูกเรียกหลังแต่ละขั้นของการคัดลอก
+    """
+    db_path = db_path or database.get_db_path()
+    backup_dir = backup_dir or BACKUP_DIR
+    pages_per_step = pages_per_step or BACKUP_PAGES_PER_STEP
+    step_sleep = BACKUP_STEP_SLEEP if step_sleep is None else step_sleep
+    os.makedirs(backup_dir, exist_ok=True)
+
+    path, partial = _reserve_path(backup_dir, _prefix(db_path))
+    started = time.perf_counter()
+    try:
+        pages, page_size = _copy(db_path, partial, pages_per_step, step_sleep, progress)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    if compress:
+        path = _gzip(path)
+    seconds = time.perf_counter() - started
+
+    removed = apply_retention(backup_dir, keep_last, max_age_days, prefix=_prefix(db_path))
+    return BackupResult(path=path, size=os.path.getsize(path), pages=pages, page_size=page_size,
+                        seconds=seconds, removed=removed)
+
+
+def list_backups(backup_dir=None, prefix=None):
+    """ไฟล์สำรองใน backup_dir เรียงจากใหม่ไปเก่า"""
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = []
+    for name in os.listdir(backup_dir):
+        match = _BACKUP_NAME.match(name)
+        if not match or (prefix and match['prefix'] != prefix):
+            continue
+        path = os.path.join(backup_dir, name)
+        backups.append(BackupFile(path=path, created=datetime.strptime(match['stamp'], _STAMP_FORMAT),
+                                  size=os.path.getsize(path), compressed=bool(match['gz']),
+                                  seq=int(match['seq'] or 0)))
+    backups.sort(key=lambda backup: (backup.created, backup.seq), reverse=True)
+    return backups
+
+
+def apply_retention(backup_dir=None, keep_last=None, max_age_days=None, prefix=None):
+    """ลบไฟล์สำรองที่เกิน keep_last ไฟล์ล่าสุด หรือเก่ากว่า max_age_days วัน คืนค่า path ที่ลบ
+
+    ไฟล์ล่าสุดถูกเก็บไว้เสมอ ไม่ว่านโยบายจะเป็นอย่างไร
+    """
+    backups = list_backups(backup_dir, prefix)
+    cutoff = datetime.now() - timedelta(days=max_age_days) if max_age_days else None
+    removed = []
+    for index, backup in enumerate(backups[1:], start=1):
+        if (keep_last is not None and index >= keep_last) or (cutoff and backup.created < cutoff):
+            os.remove(backup.path)
+            removed.append(backup.path)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="สำรองฐานข้อมูล item wiki ขณะแอปทำงาน")
+    parser.add_argument('--db', help="ไฟล์ฐานข้อมูล (ค่าเริ่มต้น: database.DB_PATH)")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="โฟลเดอร์เก็บไฟล์สำรอง")
+    parser.add_argument('--gzip', action='store_true', help="บีบอัดเป็น .db.gz")
+    parser.add_argument('--keep', type=int, help="เก็บไว้เฉพาะ N ไฟล์ล่าสุด")
+    parser.add_argument('--max-age-days', type=float, help="ลบไฟล์ที่เก่ากว่าจำนวนวันนี้")
+    parser.add_argument('--pages', type=int, default=BACKUP_PAGES_PER_STEP, help="หน้าต่อขั้น")
+    parser.add_argument('--sleep', type=float, default=BACKUP_STEP_SLEEP, help="วินาทีที่พักระหว่างขั้น")
+    parser.add_argument('--list', action='store_true', help="แสดงไฟล์สำรองที่มีอยู่แทนการสำรอง")
+    args = parser.parse_args()
+
+    if args.list:
+        for backup in list_backups(args.dir):
+            print(f"{backup.created:%Y-%m-%d %H:%M:%S}  {backup.size:>14,} B  {backup.path}")
+        return
+
+    def report(state):
+        print(f"\r{state.fraction:6.1%}  {state.bytes_per_second / 1e6:8.1f} MB/s", end="", flush=True)
+
+    result = backup_database(args.db, args.dir, compress=args.gzip, keep_last=args.keep,
+                             max_age_days=args.max_age_days, pages_per_step=args.pages,
+                             step_sleep=args.sleep, progress=report)
+    print(f"\nบันทึก {result.path} ({result.size:,} B, {result.pages:,} หน้า) ใน {result.seconds:.2f} วินาที")
+    for path in result.removed:
+        print(f"ลบไฟล์เก่า {path}")
+
+
+if __name__ == "__main__":
+    main()
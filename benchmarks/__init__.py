@@ -0,0 +1 @@
+# เครื่องมือวัดประสิทธิภาพของฐานข้อมูล item wiki (รันด้วย python -m benchmarks.<ชื่อโมดูล>)
@@ -0,0 +1,121 @@
+"""เปรียบเทียบการรัน query อิสระหลายตัว: ทีละตัว (sync) เทียบกับ asyncio.gather บน async_db
+
+วัดสองอย่าง: เวลารวมของชุด query (ได้ประโยชน์เมื่อเครื่องมีหลาย core) และเวลาที่ event loop
+ค้างนานที่สุดระหว่างรัน (sync ใน coroutine จะบล็อก loop ทั้งชุด, async_db ไม่บล็อก)
+
+รัน:  python -m benchmarks.bench_async --rows 200000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import async_db
+import database
+from benchmarks.generator import populate
+from repository import ItemFilter, ItemRepository
+
+# query ที่ไม่ขึ้นต่อกัน แบบเดียวกับที่หน้าเว็บเรียกในการ render หนึ่งครั้ง
+WORKLOAD = [
+    ItemFilter.create(search="เพลิง"),
+    ItemFilter.create(search="มังกร", names_only=True),
+    ItemFilter.create(search="Storm"),
+    ItemFilter.create(search="ปราชญ์ Holy"),
+    ItemFilter.create(rarities=["Rare"]),
+    ItemFilter.create(types=["อาวุธ"], tiers=["T1"]),
+]
+
+
+def run_sync(repository):
+    return [repository.count(item_filter) for item_filter in WORKLOAD] + [
+        database.get_facet_counts(category) for category in ('type', 'rarity', 'location', 'tier')
+    ]
+
+
+async def run_async(repository):
+    return await asyncio.gather(
+        *(repository.count(item_filter) for item_filter in WORKLOAD),
+        *(async_db.run_in_db(database.get_facet_counts, category)
+          for category in ('type', 'rarity', 'location', 'tier')),
+    )
+
+
+async def max_loop_stall(work, interval=0.001):
+    """รัน work() พร้อม heartbeat ทุก interval วินาที คืนค่าช่วงห่างของ heartbeat ที่นานที่สุด (ms)"""
+    stalls = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            stalls.append((now - last) * 1000)
+            last = now
+
+    ticker = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    await work()
+    done.set()
+    await ticker
+    return max(stalls)
+
+
+async def blocking_in_loop(repository):
+    run_sync(repository)  # แบบเดิม: เรียก database.py ตรง ๆ จาก coroutine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="บันทึกผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench_async.db")
+        database.init_database()
+        populate(args.rows)
+
+        repository = ItemRepository()
+        async_repository = async_db.AsyncItemRepository(repository)
+        expected = run_sync(repository)  # อุ่น cache ให้ทั้งสองแบบเริ่มเท่ากัน
+
+        sync_times, async_times, sync_stalls, async_stalls = [], [], [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            assert run_sync(repository) == expected
+            sync_times.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            assert asyncio.run(run_async(async_repository)) == expected
+            async_times.append((time.perf_counter() - start) * 1000)
+
+            sync_stalls.append(asyncio.run(max_loop_stall(lambda: blocking_in_loop(repository))))
+            async_stalls.append(asyncio.run(max_loop_stall(lambda: run_async(async_repository))))
+
+        async_db.shutdown_executor()
+        database.close_all_pools()
+
+    result = {
+        'rows': args.rows,
+        'queries': len(expected),
+        'workers': async_db.MAX_WORKERS,
+        'cpus': os.cpu_count(),
+        'sync_ms': round(statistics.median(sync_times), 2),
+        'gather_ms': round(statistics.median(async_times), 2),
+    }
+    result['speedup'] = round(result['sync_ms'] / result['gather_ms'], 2)
+    result['sync_loop_stall_ms'] = round(statistics.median(sync_stalls), 2)
+    result['gather_loop_stall_ms'] = round(statistics.median(async_stalls), 2)
+    print(json.dumps(result, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
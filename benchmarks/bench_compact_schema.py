@@ -0,0 +1,110 @@
+"""เปรียบเทียบ schema เดิม (ข้อความซ้ำทุกแถว) กับ schema แบบ integer foreign key (compact_schema)
+
+วัดขนาดตาราง, ขนาด index และเวลาของ query กรองที่หน้าเว็บใช้
+
+รัน:  python -m benchmarks.bench_compact_schema --rows 1000000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import compact_schema
+import database
+from benchmarks.generator import populate
+
+# ค่าตัวกรองที่ใช้วัด (ต้องมีใน master_data ที่ benchmarks.generator สร้าง)
+FILTERS = [
+    {'rarity': ["Legendary"]},
+    {'type': ["อาวุธ", "เกราะ"]},
+    {'type': ["เครื่องประดับ"], 'tier': ["T4"]},
+    {'drop_location': ["รังมังกร"], 'rarity': ["Epic", "Legendary"]},
+]
+
+# คอลัมน์ของ Item (items เดิมมี name_key เพิ่ม จึงไม่ใช้ SELECT * ในการเทียบผล)
+ITEM_COLUMNS = ("id, name, type, rarity, drop_location, tier, description, image_path, "
+                "created_at, updated_at")
+
+
+def filter_queries(item_filter):
+    """(SQL ของ schema เดิม, SQL ของ compact schema, params) สำหรับหน้าแรกของผลกรอง"""
+    params = [json.dumps(values, ensure_ascii=False) for values in item_filter.values()]
+    # ทั้งสองฝั่งซ่อนแถวระบบเหมือนหน้าเว็บ จึงใช้ partial index ชุดเดียวกัน
+    text_where = " AND ".join([database.VISIBLE_CONDITION] + [
+        f"{column} IN (SELECT value FROM json_each(?))" for column in item_filter])
+    compact_where = " AND ".join([database.VISIBLE_CONDITION] + [
+        compact_schema.reference_condition(column) for column in item_filter])
+    # compact: หา id ของหน้าจากตารางที่มีแต่ integer ก่อน แล้วค่อย join ข้อความผ่าน view
+    return (
+        f"SELECT {ITEM_COLUMNS} FROM items WHERE {text_where} ORDER BY name, id LIMIT {database.PAGE_SIZE}",
+        f"SELECT {ITEM_COLUMNS} FROM items_compact_view WHERE id IN ("
+        f"SELECT id FROM items_compact WHERE {compact_where} ORDER BY name, id LIMIT {database.PAGE_SIZE}"
+        f") ORDER BY name, id",
+        f"SELECT COUNT(*) FROM items WHERE {text_where}",
+        f"SELECT COUNT(*) FROM items_compact WHERE {compact_where}",
+        params,
+    )
+
+
+def time_query(conn, query, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3), [tuple(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="บันทึกผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "text.db")
+        target_path = os.path.join(tmp, "compact.db")
+        database.DB_PATH = source_path
+        database.init_database()
+        populate(args.rows)
+        database.close_all_pools()
+        compact_schema.convert(source_path, target_path)
+
+        source, target = sqlite3.connect(source_path), sqlite3.connect(target_path)
+        source.execute("ANALYZE")  # convert() รัน ANALYZE ให้ไฟล์ compact แล้ว ให้สองฝั่งมีสถิติเท่ากัน
+        result = {
+            'rows': args.rows,
+            'text': compact_schema.object_sizes(source, 'items'),
+            'compact': compact_schema.object_sizes(target, 'items_compact'),
+            'queries': [],
+        }
+        for item_filter in FILTERS:
+            text_page, compact_page, text_count, compact_count, params = filter_queries(item_filter)
+            text_page_ms, text_rows = time_query(source, text_page, params, args.repeat)
+            compact_page_ms, compact_rows = time_query(target, compact_page, params, args.repeat)
+            text_count_ms, text_total = time_query(source, text_count, params, args.repeat)
+            compact_count_ms, compact_total = time_query(target, compact_count, params, args.repeat)
+            result['queries'].append({
+                'filter': item_filter,
+                'matches': text_total[0][0],
+                'text_page_ms': text_page_ms,
+                'compact_page_ms': compact_page_ms,
+                'text_count_ms': text_count_ms,
+                'compact_count_ms': compact_count_ms,
+                'same_result': text_rows == compact_rows and text_total == compact_total,
+            })
+        source.close()
+        target.close()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
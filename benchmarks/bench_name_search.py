@@ -0,0 +1,84 @@
+"""เปรียบเทียบการค้นหาชื่อไอเท็มแบบ substring: LIKE '%…%' เทียบกับ trigram index (items_fts)
+
+รัน:  python -m benchmarks.bench_name_search --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import database
+from benchmarks.generator import populate
+
+# คำค้นไทยล้วน, อังกฤษล้วน และไทยปนอังกฤษ (ทุกคำยาว >= 3 ตัวอักษร จึงใช้ trigram ได้)
+QUERIES = ["เพลิง", "มังกร", "Storm", "agon", "ดาบ Fire", "นักปราชญ์ Holy", "ไม่มีคำนี้"]
+
+
+def time_query(query, params, repeat):
+    timings = []
+    rows = 0
+    with database.get_db_connection() as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(conn.execute(query, params).fetchall())
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def bench_size(count, repeat):
+    results = []
+    for text in QUERIES:
+        like_conditions = " AND ".join(["name LIKE ?"] * len(text.split()))
+        like_ms, like_rows = time_query(
+            f"SELECT id FROM items WHERE {like_conditions}",
+            [f"%{term}%" for term in text.split()],
+            repeat,
+        )
+        trigram_ms, trigram_rows = time_query(
+            "SELECT rowid FROM items_fts WHERE items_fts MATCH ?",
+            (database.fts_match_expression(text, 'name'),),
+            repeat,
+        )
+        results.append({
+            'rows': count,
+            'query': text,
+            'matches': trigram_rows,
+            'like_ms': round(like_ms, 3),
+            'trigram_ms': round(trigram_ms, 3),
+            'speedup': round(like_ms / trigram_ms, 1) if trigram_ms else None,
+            'same_result': like_rows == trigram_rows,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="บันทึกผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            database.DB_PATH = os.path.join(tmp, f"bench_{count}.db")
+            database.init_database()
+            start = time.perf_counter()
+            populate(count)
+            print(f"# {count:,} rows loaded in {time.perf_counter() - start:.1f}s")
+            for row in bench_size(count, args.repeat):
+                print(f"{row['rows']:>9,}  {row['query']:<18} matches={row['matches']:<8} "
+                      f"LIKE={row['like_ms']:>9.2f}ms  trigram={row['trigram_ms']:>8.2f}ms  "
+                      f"x{row['speedup']}")
+                results.append(row)
+            database.close_all_pools()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
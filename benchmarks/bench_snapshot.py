@@ -0,0 +1,99 @@
+"""เปรียบเทียบการอ่านหน้าค้นหาจากไฟล์ฐานข้อมูลกับจาก snapshot ใน memory (database.read_snapshot)
+
+วัดทั้งตอนไม่มีการเขียน และตอนมี writer แก้ไขไอเท็มต่อเนื่องอยู่เบื้องหลัง
+
+รัน:  python -m benchmarks.bench_snapshot --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+import database
+from benchmarks.generator import populate
+from models import Item
+from repository import ItemFilter, ItemRepository
+
+
+def read_cases(repository):
+    return {
+        'get_x50': lambda: [repository.get(item_id) for item_id in range(1, 1000, 20)],
+        'filter_page': lambda: repository.list_page(ItemFilter.create(rarities=["Legendary"])),
+        'filter_count': lambda: repository.count(ItemFilter.create(types=["อาวุธ"], tiers=["T4"])),
+        'search_page': lambda: repository.list_page(ItemFilter.create(search="มังกร")),
+    }
+
+
+def time_case(func, repeat):
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def run_reads(repository, repeat):
+    results = {}
+    for name, func in read_cases(repository).items():
+        disk_ms = time_case(func, repeat)
+        with database.read_snapshot():
+            snapshot_ms = time_case(func, repeat)
+        results[name] = {'disk_ms': disk_ms, 'snapshot_ms': snapshot_ms}
+    return results
+
+
+def background_writer(repository, stop, interval):
+    rng = random.Random(3)
+    i = 0
+    while not stop.is_set():
+        item = repository.get(rng.randint(1, 1000))
+        if item is not None:
+            repository.update(Item(id=item.id, name=f"แก้ไข {i} {item.name}"[:80], type=item.type,
+                                   rarity=item.rarity, drop_location=item.drop_location, tier=item.tier,
+                                   description=item.description, image_path=item.image_path))
+            i += 1
+        stop.wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--write-interval', type=float, default=0.01, help="วินาทีระหว่างการเขียนเบื้องหลัง")
+    parser.add_argument('--output', help="บันทึกผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    database.SLOW_QUERY_MS = None
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench_snapshot.db")
+        database.init_database()
+        populate(args.rows)
+        repository = ItemRepository()
+
+        result = {'rows': args.rows, 'idle': run_reads(repository, args.repeat)}
+
+        stop = threading.Event()
+        writer = threading.Thread(target=background_writer, args=(repository, stop, args.write_interval))
+        writer.start()
+        try:
+            result['with_writes'] = run_reads(repository, args.repeat)
+        finally:
+            stop.set()
+            writer.join()
+        result['snapshot'] = database.get_snapshot_stats()
+        database.close_all_pools()
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""สร้างแคตตาล็อกไอเท็มจำลองแบบกำหนดผลได้ (seed เดียวกัน → ข้อมูลเหมือนกันทุกครั้ง)
+
+ชื่อไอเท็มเป็นภาษาไทยปนอังกฤษแบบเดียวกับเกมจริง ความหายากกระจายแบบเบ้ (Common มากสุด)
+และมีแถวระบบ (ชื่อขึ้นต้นด้วย [ ) ปนอยู่เล็กน้อย ใช้ได้ตั้งแต่หลักหมื่นถึงหลายล้านแถว
+
+    from benchmarks.generator import populate
+    populate(100_000)
+"""
+import random
+
+import database
+
+THAI_PREFIXES = ["ดาบ", "เกราะ", "แหวน", "ธนู", "คทา", "โล่", "สร้อย", "มีดสั้น", "รองเท้า", "หมวก",
+                 "ถุงมือ", "หอก", "ขวาน", "ผ้าคลุม", "เข็มขัด", "ตำรา", "ยันต์", "กำไล"]
+THAI_SUFFIXES = ["แห่งเพลิง", "น้ำแข็ง", "สายฟ้า", "มังกร", "จอมเวท", "เงามรณะ", "นักปราชญ์", "พิษ",
+                 "แห่งโชค", "เทพ", "ราชันย์", "อสูร", "พายุ", "แสงจันทร์", "นิรันดร์", "ผู้พิทักษ์"]
+ENGLISH_WORDS = ["Fire", "Frost", "Storm", "Shadow", "Dragon", "Arcane", "Venom", "Holy", "Iron", "Ancient",
+                 "Crimson", "Eclipse", "Titan", "Phantom", "Radiant", "Abyss"]
+DESCRIPTION_EFFECTS = ["เพิ่มพลังโจมตี", "เพิ่มพลังป้องกัน", "เพิ่มอัตราคริติคอล", "ฟื้นฟู HP",
+                       "ลดคูลดาวน์สกิล", "เพิ่มความเร็วเคลื่อนที่", "โอกาสติดสถานะเผาไหม้",
+                       "ต้านทานน้ำแข็ง", "ดูดเลือด", "เพิ่มอัตราดรอป"]
+
+# ค่า master data เพิ่มเติมจากค่าเริ่มต้นของ init_database (แคตตาล็อกจริงมีสถานที่ดรอปหลายสิบแห่ง)
+EXTRA_TYPES = ["อาวุธสองมือ", "ลูกธนู", "ยา", "วัตถุดิบ", "ชิ้นส่วนเควส"]
+EXTRA_LOCATIONS = [f"{area} ชั้น {floor}" for area in
+                   ["หอคอยสายฟ้า", "สุสานโบราณ", "เหมืองร้าง", "วิหารจันทรา", "ทะเลทรายแดง", "หุบเขาน้ำแข็ง"]
+                   for floor in range(1, 6)]
+EXTRA_TIERS = ["T5"]
+
+# ความหายาก → น้ำหนักการสุ่ม (ไอเท็มหายากมีน้อย)
+RARITY_WEIGHTS = {"Common": 50, "Uncommon": 25, "Rare": 15, "Epic": 7, "Legendary": 3}
+SYSTEM_ROW_EVERY = 10_000  # แถวระบบ 1 แถวต่อไอเท็มทุก ๆ จำนวนนี้
+
+INSERT_BATCH_SIZE = 50_000  # แถวต่อ transaction ตอนเติมข้อมูล
+
+
+def seed_master_data():
+    """เพิ่มค่า master data ชุดขยาย (ค่าที่มีอยู่แล้วถูกข้าม)"""
+    for category, values in (('type', EXTRA_TYPES), ('location', EXTRA_LOCATIONS), ('tier', EXTRA_TIERS)):
+        existing = {row['value'] for row in database.get_master_data(category)}
+        for value in values:
+            if value not in existing:
+                database.add_master_data(category, value)
+
+
+def master_values():
+    """ค่าปัจจุบันของทุกหมวด {หมวด: [ค่า, ...]}"""
+    return {category: [row['value'] for row in database.get_master_data(category)]
+            for category in ('type', 'rarity', 'location', 'tier')}
+
+
+def generate_names(count, seed=42):
+    """ชื่อไอเท็มที่ไม่ซ้ำกัน (ต่อท้ายด้วยลำดับ) เช่น 'ดาบแห่งเพลิง Storm 17'"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (
+            f"{rng.choice(THAI_PREFIXES)}{rng.choice(THAI_SUFFIXES)} "
+            f"{rng.choice(ENGLISH_WORDS)} {i}"
+        )
+
+
+def generate_items(count, values, seed=42):
+    """แถว (name, type, rarity, drop_location, tier, description, image_path) จำนวน count แถว"""
+    rng = random.Random(seed)
+    rarities = [rarity for rarity in RARITY_WEIGHTS if rarity in values['rarity']] or values['rarity']
+    weights = [RARITY_WEIGHTS.get(rarity, 1) for rarity in rarities]
+    for i, name in enumerate(generate_names(count, seed)):
+        if i % SYSTEM_ROW_EVERY == SYSTEM_ROW_EVERY - 1:
+            name = f"[SYSTEM] {name}"
+        effects = rng.sample(DESCRIPTION_EFFECTS, 2)
+        description = f"{effects[0]} {rng.randint(5, 50)}% และ{effects[1]} {rng.randint(5, 50)}%"
+        yield (
+            name,
+            rng.choice(values['type']),
+            rng.choices(rarities, weights)[0],
+            rng.choice(values['location']),
+            rng.choice(values['tier']),
+            description,
+            "assets/images/placeholder.png",
+        )
+
+
+def populate(count, seed=42, batch_size=INSERT_BATCH_SIZE):
+    """เติม master data ชุดขยายและไอเท็ม count ชิ้นลงฐานข้อมูลปัจจุบัน (database.DB_PATH)
+
+    แบ่งเป็น transaction ละ batch_size แถว เพื่อไม่ให้ WAL โตเกินไปตอนสร้างหลายล้านแถว
+    """
+    seed_master_data()
+    rows = generate_items(count, master_values(), seed)
+    with database.get_db_connection() as conn:
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            conn.execute("BEGIN")
+            conn.executemany('''
+                INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            conn.commit()
+        conn.execute("ANALYZE")
@@ -0,0 +1,279 @@
+"""ชุดวัดประสิทธิภาพของเส้นทางที่ใช้บ่อย บนแคตตาล็อกจำลองจาก benchmarks.generator
+
+วัด: ค้นหาพร้อมตัวกรอง, ค้นชื่อ, ตรวจชื่อซ้ำ, นำเข้า CSV, นับการใช้งานในหน้า ADMIN
+และการ render หน้าค้นหาแบบการ์ดผ่าน Streamlit AppTest (ข้ามถ้าไม่ได้ติดตั้ง streamlit)
+ผลลัพธ์เป็น JSON พร้อม commit ของ git เพื่อนำไปเทียบระหว่าง commit ได้
+
+รัน:     python -m benchmarks.suite --rows 10000 100000 1000000
+เทียบผล: python -m benchmarks.suite --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import database
+from benchmarks.generator import generate_items, master_values, populate
+from models import Item
+from repository import ItemFilter, ItemRepository
+
+try:
+    from streamlit.testing.v1 import AppTest
+except ImportError:
+    AppTest = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+APP_PATH = os.path.join(ROOT, "app.py")
+
+CSV_IMPORT_ROWS = 2_000
+CSV_IMPORT_BATCH_SIZE = 1000  # เท่ากับ IMPORT_BATCH_SIZE ของหน้าจัดการไอเท็ม
+APP_TIMEOUT = 300
+
+
+def measure(func, repeat, teardown=None):
+    """รัน func ซ้ำ repeat ครั้ง คืนค่าสถิติเวลา (ms) — teardown(ผลของ func) รันหลังแต่ละรอบโดยไม่นับเวลา"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outcome = func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if teardown is not None:
+            teardown(outcome)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_ms': round(timings[0], 3),
+        'runs': repeat,
+    }
+
+
+# ===== กรณีทดสอบ =====
+# แต่ละกรณีรับ context แล้วคืนค่า dict ของ {ชื่อย่อย: ฟังก์ชันที่จะจับเวลา หรือ (ฟังก์ชัน, teardown)}
+
+def filtered_search_cases(ctx):
+    repository = ctx['repository']
+    filters = {
+        'rarity': ItemFilter.create(rarities=["Legendary"]),
+        'type_tier': ItemFilter.create(types=["อาวุธ", "เกราะ"], tiers=["T3", "T4"]),
+        'all_dimensions': ItemFilter.create(types=["อาวุธ"], rarities=["Epic", "Legendary"],
+                                            locations=ctx['values']['location'][:5], tiers=["T4"]),
+        'search_and_filter': ItemFilter.create(search="มังกร", rarities=["Rare", "Epic"]),
+    }
+    cases = {}
+    for name, item_filter in filters.items():
+        cases[name] = lambda f=item_filter: (repository.count(f), repository.list_page(f))
+    return cases
+
+
+def name_search_cases(ctx):
+    repository = ctx['repository']
+    cases = {}
+    for text in ["เพลิง", "Storm", "ดาบ Fire", "ไม่มีคำนี้"]:
+        item_filter = ItemFilter.create(search=text, names_only=True)
+        cases[text] = lambda f=item_filter: (repository.count(f), repository.list_page(f))
+    by_name = ItemFilter.create(search="เพลิง", sort='name')
+    cases['เพลิง (sort=name)'] = lambda: (repository.count(by_name), repository.list_page(by_name))
+    return cases
+
+
+def duplicate_check_cases(ctx):
+    repository = ctx['repository']
+    rng = random.Random(7)
+    existing = [row['name'] for row in database.execute_query(
+        "SELECT name FROM items WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(rng.sample(range(1, ctx['rows'] + 1), min(100, ctx['rows']))),)
+    )]
+    return {
+        'existing_x100': lambda: [repository.name_exists(f"  {name.upper()} ") for name in existing],
+        'missing_x100': lambda: [repository.name_exists(f"ไม่มีชื่อนี้ {i}") for i in range(100)],
+    }
+
+
+def _csv_text(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["name", "type", "rarity", "drop_location", "tier", "description"])
+    writer.writerows(row[:6] for row in rows)
+    return out.getvalue()
+
+
+def csv_import_cases(ctx):
+    """อ่านไฟล์ CSV แล้วบันทึกทีละชุดด้วย add_many แบบเดียวกับหน้าจัดการไอเท็ม
+
+    แต่ละรอบใช้ชื่อชุดใหม่ (seed ต่างกัน) และลบออกหลังจับเวลา เพื่อให้ทุกรอบเริ่มจากตารางขนาดเดิม
+    """
+    repository = ctx['repository']
+    runs = iter(range(1_000_000))
+
+    def run():
+        seed = 1000 + next(runs)
+        rows = [(f"นำเข้า{seed}-{row[0]}",) + row[1:]
+                for row in generate_items(CSV_IMPORT_ROWS, ctx['values'], seed=seed)]
+        text = _csv_text(rows)
+        if pd is not None:
+            records = pd.read_csv(io.StringIO(text)).fillna("").to_dict('records')
+        else:
+            records = list(csv.DictReader(io.StringIO(text)))
+        items = [Item.from_dict(record) for record in records]
+        ids = []
+        for start in range(0, len(items), CSV_IMPORT_BATCH_SIZE):
+            results = repository.add_many(items[start:start + CSV_IMPORT_BATCH_SIZE])
+            ids.extend(result.lastrowid for result in results if result.ok)
+        return ids
+
+    return {f'{CSV_IMPORT_ROWS}_rows ({"pandas" if pd is not None else "csv"})': (run, repository.delete_many)}
+
+
+def admin_count_cases(ctx):
+    categories = ('type', 'rarity', 'location', 'tier')
+    return {
+        'facet_counts_all_tabs': lambda: [database.get_facet_counts(c, include_system=True) for c in categories],
+        'in_use_check': lambda: database.get_facet_counts('location', [ctx['values']['location'][0]],
+                                                          include_system=True),
+        'sidebar_stats': ctx['repository'].stats,
+    }
+
+
+def card_render_cases(ctx):
+    """render หน้า "ค้นหาไอเท็ม" (มุมมองการ์ด) ทั้งหน้าผ่าน AppTest"""
+    if AppTest is None:
+        return None
+    app = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT)
+    app.run()
+    app.sidebar.radio[0].set_value("🔍 ค้นหาไอเท็ม").run()
+
+    def rerun():
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+    return {'search_page_cards': rerun}
+
+
+CASES = {
+    'filtered_search': filtered_search_cases,
+    'name_search': name_search_cases,
+    'duplicate_check': duplicate_check_cases,
+    'csv_import': csv_import_cases,
+    'admin_counts': admin_count_cases,
+    'card_render': card_render_cases,
+}
+
+
+def run_size(rows, repeat, selected):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, f"catalog_{rows}.db")
+        database.init_database()
+        start = time.perf_counter()
+        populate(rows)
+        load_seconds = time.perf_counter() - start
+        print(f"# {rows:,} rows loaded in {load_seconds:.1f}s")
+
+        ctx = {'rows': rows, 'repository': ItemRepository(), 'values': master_values()}
+        result = {'rows': rows, 'load_seconds': round(load_seconds, 2),
+                  'file_bytes': os.path.getsize(database.DB_PATH), 'cases': {}}
+        for name in selected:
+            cases = CASES[name](ctx)
+            if cases is None:
+                result['cases'][name] = {'skipped': "streamlit ไม่ได้ติดตั้ง"}
+                print(f"{name:<16} skipped")
+                continue
+            result['cases'][name] = {}
+            for label, func in cases.items():
+                func, teardown = func if isinstance(func, tuple) else (func, None)
+                measure(func, 1, teardown)  # อุ่น cache ของ SQLite / statement cache ก่อนจับเวลา
+                timing = measure(func, repeat, teardown)
+                result['cases'][name][label] = timing
+                print(f"{name:<16} {label:<28} median={timing['median_ms']:>10.2f}ms  p95={timing['p95_ms']:>10.2f}ms")
+        database.close_all_pools()
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=ROOT, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(old_path, new_path):
+    """พิมพ์อัตราส่วนเวลา median ของผลสองไฟล์ (< 1 คือเร็วขึ้น)"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['environment']['commit']} → {new['environment']['commit']}")
+    old_sizes = {size['rows']: size for size in old['sizes']}
+    for size in new['sizes']:
+        before = old_sizes.get(size['rows'])
+        if before is None:
+            continue
+        for case, labels in size['cases'].items():
+            for label, timing in labels.items():
+                previous = before['cases'].get(case, {}).get(label)
+                if not isinstance(timing, dict) or not isinstance(previous, dict):
+                    continue
+                ratio = timing['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+                print(f"{size['rows']:>9,}  {case:<16} {label:<28} "
+                      f"{previous['median_ms']:>10.2f} → {timing['median_ms']:>10.2f}ms  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--output', help="ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น: benchmarks/results/<commit>-<เวลา>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="เทียบผลสองไฟล์แทนการรัน")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    database.SLOW_QUERY_MS = None  # ไม่ต้องเขียน slow log ระหว่างวัด
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': args.repeat, 'cases': args.cases},
+        'sizes': [run_size(rows, args.repeat, args.cases) for rows in args.rows],
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{report['environment']['commit'] or 'nogit'}-{stamp}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"# บันทึกผลที่ {output}")
+
+
+if __name__ == "__main__":
+    main()
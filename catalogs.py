@@ -0,0 +1,222 @@
+"""หลายแคตตาล็อก (หนึ่งไฟล์ฐานข้อมูลต่อหนึ่งเกม) ในแอปเดียว
+
+รายชื่อแคตตาล็อกเก็บใน CATALOGS_FILE (JSON) ถ้าไม่มีไฟล์นี้จะมีแคตตาล็อกเดียวคือ 'default'
+ที่ชี้ไป database.DB_PATH เหมือนเดิม แต่ละ session เลือกแคตตาล็อกแล้วเรียก activate_catalog()
+ตอนต้นของทุก rerun — query ทั้งหมดใน thread นั้นจะใช้ไฟล์ของแคตตาล็อกนั้น (database.set_db_path)
+pool, writer, snapshot และ cache ของ master data แยกกันตามไฟล์อยู่แล้ว จึงไม่ปนกันระหว่างเกม
+และ database.MAX_OPEN_DATABASES จำกัดจำนวนไฟล์ที่เปิดค้างไว้พร้อมกัน
+
+search_catalogs() ค้นหลายแคตตาล็อกพร้อมกันด้วยการ ATTACH ไฟล์แบบอ่านอย่างเดียว
+เข้ากับ connection ใน memory ชั่วคราว (ไม่แตะ pool ของแคตตาล็อกใด)
+
+รัน:  python catalogs.py add poe2 "Path of Exile 2"
+      python catalogs.py list
+      python catalogs.py search "มังกร"
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import database
+
+CATALOGS_FILE = "catalogs.json"
+CATALOGS_DIR = "catalogs"
+DEFAULT_CATALOG = "default"
+ATTACH_LIMIT = 10        # SQLITE_MAX_ATTACHED ค่าเริ่มต้น: ค้นทีละกลุ่มไม่เกินจำนวนนี้
+SEARCH_LIMIT = 50
+
+_SLUG = re.compile(r"^[a-z0-9][a-z0-9_-]{0,39}$")
+
+_registry_cache = {}
+_registry_lock = threading.Lock()
+_initialized = set()
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """แคตตาล็อกหนึ่งเกม: slug (ใช้ใน URL/CLI), ชื่อที่แสดง และไฟล์ฐานข้อมูล"""
+    slug: str
+    name: str
+    path: str
+
+
+def _default_catalog():
+    return Catalog(slug=DEFAULT_CATALOG, name="Item Wiki", path=database.DB_PATH)
+
+
+def load_catalogs():
+    """{slug: Catalog} ตามลำดับในไฟล์ (อ่านไฟล์ใหม่เมื่อ mtime เปลี่ยน)"""
+    try:
+        mtime = os.path.getmtime(CATALOGS_FILE)
+    except OSError:
+        return {DEFAULT_CATALOG: _default_catalog()}
+    cached = _registry_cache.get(CATALOGS_FILE)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(CATALOGS_FILE, encoding='utf-8') as f:
+        entries = json.load(f).get('catalogs', [])
+    catalogs = {entry['slug']: Catalog(**entry) for entry in entries}
+    catalogs.setdefault(DEFAULT_CATALOG, _default_catalog())
+    _registry_cache[CATALOGS_FILE] = (mtime, catalogs)
+    return catalogs
+
+
+def get_catalog(slug):
+    """แคตตาล็อกตาม slug (ไม่มี → KeyError)"""
+    catalogs = load_catalogs()
+    if slug not in catalogs:
+        raise KeyError(f"ไม่พบแคตตาล็อก '{slug}'")
+    return catalogs[slug]
+
+
+def register_catalog(slug, name, path=None):
+    """เพิ่มแคตตาล็อกใหม่และสร้างไฟล์ฐานข้อมูล (path เริ่มต้น: CATALOGS_DIR/<slug>.db) คืนค่า Catalog"""
+    if not _SLUG.match(slug):
+        raise ValueError(f"slug ไม่ถูกต้อง: '{slug}' (a-z, 0-9, - และ _ ไม่เกิน 40 ตัว)")
+    with _registry_lock:
+        catalogs = dict(load_catalogs())
+        if slug in catalogs:
+            raise ValueError(f"มีแคตตาล็อก '{slug}' อยู่แล้ว")
+        catalog = Catalog(slug=slug, name=name, path=path or os.path.join(CATALOGS_DIR, f"{slug}.db"))
+        os.makedirs(os.path.dirname(catalog.path) or ".", exist_ok=True)
+        catalogs[slug] = catalog
+        _write_registry(catalogs)
+    ensure_catalog(slug)
+    return catalog
+
+
+def _write_registry(catalogs):
+    # 'default' ที่ยังชี้ DB_PATH ไม่ถูกบันทึก เพื่อให้ตามค่า DB_PATH ปัจจุบันเสมอ
+    entries = [asdict(catalog) for catalog in catalogs.values() if catalog != _default_catalog()]
+    partial = CATALOGS_FILE + ".partial"
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump({'catalogs': entries}, f, ensure_ascii=False, indent=2)
+    os.replace(partial, CATALOGS_FILE)
+
+
+def ensure_catalog(slug):
+    """สร้างตาราง/รัน migration ของแคตตาล็อกครั้งแรกที่ถูกใช้ใน process นี้ คืนค่า Catalog"""
+    catalog = get_catalog(slug)
+    if catalog.path not in _initialized:
+        with database.use_db_path(catalog.path):
+            database.init_database()
+        _initialized.add(catalog.path)
+    return catalog
+
+
+def activate_catalog(slug):
+    """ให้ thread ปัจจุบัน (script thread ของ session) ใช้แคตตาล็อกนี้ไปจนกว่าจะเปลี่ยน"""
+    catalog = ensure_catalog(slug)
+    database.set_db_path(catalog.path)
+    return catalog
+
+
+@contextmanager
+def use_catalog(slug):
+    """ใช้แคตตาล็อกชั่วคราวภายใน with (เช่นงานเบื้องหลังหรือ CLI)"""
+    with database.use_db_path(ensure_catalog(slug).path):
+        yield
+
+
+# ===== ค้นข้ามแคตตาล็อก =====
+
+_RESULT_COLUMNS = "i.id, i.name, i.type, i.rarity, i.drop_location, i.tier, i.description, i.image_path"
+
+
+def _search_select(schema, text, names_only):
+    """SELECT ของแคตตาล็อกหนึ่ง (schema ที่ ATTACH ไว้) คืนค่า (sql, params ต่อจาก slug)"""
+    match = database.fts_match_expression(text, 'name' if names_only else None)
+    if match is None:
+        condition, params = database.search_condition(text, names_only)
+        return f'''
+            SELECT * FROM (
+                SELECT ? AS catalog, {_RESULT_COLUMNS}, NULL AS score
+                FROM {schema}.items i
+                WHERE i.{database.VISIBLE_CONDITION} AND {condition}
+                ORDER BY i.name, i.id LIMIT ?
+            )
+        ''', params
+    # คำที่สั้นกว่า trigram กรองด้วย LIKE บนแถวที่ FTS พบ
+    short, short_params = database.short_terms_condition(text, names_only)
+    # MATCH/bm25 อ้างชื่อตารางโดยไม่ระบุ schema ได้ เพราะหมายถึงตารางใน FROM ของ subquery นั้น
+    return f'''
+        SELECT * FROM (
+            SELECT ? AS catalog, {_RESULT_COLUMNS}, fts.score AS score
+            FROM {schema}.items i JOIN (
+                SELECT rowid, bm25(items_fts, {database.FTS_NAME_WEIGHT}, 1.0) AS score
+                FROM {schema}.items_fts WHERE items_fts MATCH ?
+            ) AS fts ON fts.rowid = i.id
+            WHERE i.{database.VISIBLE_CONDITION} AND {short or "1=1"}
+            ORDER BY fts.score LIMIT ?
+        )
+    ''', (match, *short_params)
+
+
+def _search_group(catalogs, text, limit, names_only):
+    # connection ชั่วคราวใน memory: ไฟล์ของแคตตาล็อกถูก ATTACH แบบอ่านอย่างเดียว
+    conn = database._open_connection("file::memory:")
+    try:
+        selects, params = [], []
+        for index, catalog in enumerate(catalogs):
+            schema = f"c{index}"
+            uri = "file:" + urllib.parse.quote(os.path.abspath(catalog.path)) + "?mode=ro"
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            sql, select_params = _search_select(schema, text, names_only)
+            selects.append(sql)
+            params.extend((catalog.slug, *select_params, limit))
+        return [dict(row) for row in conn.execute(" UNION ALL ".join(selects), params)]
+    finally:
+        conn.close()
+
+
+def search_catalogs(text, slugs=None, limit=SEARCH_LIMIT, names_only=False):
+    """ค้นไอเท็มในหลายแคตตาล็อก คืนค่า list ของ dict (มีคีย์ 'catalog') เรียงตามความเกี่ยวข้อง
+
+    ค่า bm25 คำนวณจากสถิติของแต่ละไฟล์ จึงเทียบข้ามแคตตาล็อกได้แบบประมาณ
+    คำค้นที่สั้นกว่า trigram ใช้ LIKE และเรียงตามชื่อแทน
+    """
+    if not (text or "").strip():
+        return []
+    catalogs = load_catalogs()
+    selected = [catalogs[slug] for slug in (slugs or catalogs) if slug in catalogs]
+    selected = [catalog for catalog in selected if os.path.exists(catalog.path)]
+    results = []
+    for start in range(0, len(selected), ATTACH_LIMIT):
+        results.extend(_search_group(selected[start:start + ATTACH_LIMIT], text, limit, names_only))
+    results.sort(key=lambda row: (row['score'] or 0.0, row['name']))
+    return results[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="จัดการแคตตาล็อกของ item wiki")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="แสดงแคตตาล็อกทั้งหมด")
+    add = commands.add_parser('add', help="เพิ่มแคตตาล็อกใหม่")
+    add.add_argument('slug')
+    add.add_argument('name')
+    add.add_argument('--path', help="ไฟล์ฐานข้อมูล (ค่าเริ่มต้น: catalogs/<slug>.db)")
+    search = commands.add_parser('search', help="ค้นไอเท็มในทุกแคตตาล็อก")
+    search.add_argument('text')
+    search.add_argument('--catalog', nargs='+', help="ค้นเฉพาะแคตตาล็อกเหล่านี้")
+    search.add_argument('--limit', type=int, default=SEARCH_LIMIT)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for catalog in load_catalogs().values():
+            print(f"{catalog.slug:<20} {catalog.name:<30} {catalog.path}")
+    elif args.command == 'add':
+        catalog = register_catalog(args.slug, args.name, args.path)
+        print(f"เพิ่ม {catalog.slug} → {catalog.path}")
+    else:
+        for row in search_catalogs(args.text, args.catalog, args.limit):
+            print(f"{row['catalog']:<20} {row['name']:<40} {row['type']} / {row['rarity']} / {row['tier']}")
+    database.close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Change feed: export/นำเข้าการเปลี่ยนแปลงตั้งแต่ seq N เป็น NDJSON
+
+trigger (migration 9) บันทึกทุก insert/update/delete ของ items และ master_data ลง change_log
+พร้อม seq ที่เพิ่มขึ้นเสมอ export_changes(since=N) ส่งออกสถานะล่าสุดของทุกแถวที่เปลี่ยนหลัง seq N
+(แถวที่เปลี่ยนหลายครั้งถูกส่งครั้งเดียว, แถวที่ถูกลบเป็น op 'delete') เรียงตาม seq ของทุก entity รวมกัน
+อ่านใน read transaction เดียว จึงได้ชุดข้อมูลที่สอดคล้องกัน ณ last_seq ของ header
+
+apply_changes() นำ delta ไปใช้กับอีกไฟล์ (replica ที่สร้างจากไฟล์สำรองหรือจาก export ตั้งแต่ 0)
+ทีละ APPLY_BATCH_SIZE แถวต่อคำขอเขียน รายการที่ชนกับแถวอื่น (เช่นสลับชื่อสองไอเท็ม ซึ่งหลังรวมรายการ
+แล้วลำดับใดก็ชนกันชั่วคราว) ถูกเลื่อนไปลองใหม่ตอนท้าย ส่วน sync_from() ทำทั้งสองขั้นระหว่างสองไฟล์
+จำ seq ล่าสุดของต้นทางไว้ในตาราง sync_cursor และรายการที่ยังชนอยู่ไว้ใน sync_conflict
+
+รูปแบบ NDJSON (หนึ่ง JSON ต่อบรรทัด):
+    {"type": "header", "since": 0, "last_seq": 120, "exported_at": "..."}
+    {"type": "change", "seq": 7, "entity": "master_data", "op": "upsert", "id": 3, "data": {...}}
+    {"type": "change", "seq": 118, "entity": "items", "op": "delete", "id": 42, "data": null}
+
+รัน:  python changes.py export --since 0 -o delta.ndjson
+      python changes.py apply delta.ndjson --db replica.db
+      python changes.py sync item_wiki.db --db replica.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import database
+
+APPLY_BATCH_SIZE = 500       # การเปลี่ยนแปลงต่อหนึ่งคำขอเขียนตอน apply
+COMPACT_CHUNK_SIZE = 10_000  # ช่วง seq ต่อหนึ่งคำขอเขียนตอน compact
+
+ENTITY_COLUMNS = {
+    'master_data': ('category', 'value', 'color', 'sort_order', 'created_at'),
+    'items': ('name', 'type', 'rarity', 'drop_location', 'tier', 'description', 'image_path',
+              'created_at', 'updated_at'),
+}
+
+# คีย์ unique ของแต่ละ entity ถูกย้ายไปค่าชั่วคราวที่ไม่ชนใคร (char(31) || id) ตอนลองรายการที่ชนกันรอบสุดท้าย
+# แถวที่ถูกย้ายคือแถวที่กำลังจะถูกเขียนทับด้วยรายการนั้นเอง
+PARK_ASSIGNMENTS = {
+    'master_data': "value = char(31) || id",
+    'items': "name_key = char(31) || id",
+}
+
+
+@dataclass
+class ApplyResult:
+    """ผลของ apply_changes (errors: [(seq, entity, id, ข้อความ), ...] ของรายการที่ถูกข้าม)
+
+    sync_from เติม since และ cursor (seq ที่บันทึกใน sync_cursor)
+    """
+    last_seq: int = None
+    applied: int = 0
+    errors: list = field(default_factory=list)
+    since: int = 0
+    cursor: int = None
+
+
+def latest_seq():
+    """seq ล่าสุดของ change_log (0 ถ้ายังไม่มี)"""
+    row = database.execute_query("SELECT MAX(seq) AS seq FROM change_log", fetch_one=True)
+    return row['seq'] or 0
+
+
+def items_updated_since(timestamp, limit=1000):
+    """ไอเท็มที่ updated_at ใหม่กว่า timestamp (ใช้ idx_items_updated_at) เรียงจากเก่าไปใหม่"""
+    return database.execute_query(
+        "SELECT * FROM items WHERE updated_at > ? ORDER BY updated_at, id LIMIT ?", (timestamp, limit))
+
+
+# ===== Export =====
+
+def iter_changes(since=0, include=()):
+    """yield header แล้วตามด้วยการเปลี่ยนแปลงทีละรายการ (dict) หลัง seq since เรียงตาม seq
+
+    include: [(entity, id), ...] ที่ต้องส่งสถานะล่าสุดด้วยแม้ไม่ได้เปลี่ยนหลัง since (sync_from ใช้ลองรายการที่ชนกันซ้ำ)
+    ทั้งหมดอ่านใน read transaction เดียว (connection ของ pool ถูกยืมไว้จนกว่าจะอ่านหมด)
+    """
+    columns = ", ".join(f"{entity}.id IS NOT NULL AS {entity}__present, "
+                        + ", ".join(f"{entity}.{c} AS {entity}__{c}" for c in entity_columns)
+                        for entity, entity_columns in ENTITY_COLUMNS.items())
+    joins = "\n".join(f"LEFT JOIN {entity} ON c.entity = '{entity}' AND {entity}.id = c.entity_id"
+                      for entity in ENTITY_COLUMNS)
+    with database.get_db_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            last_seq = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+            yield {'type': 'header', 'since': since, 'last_seq': last_seq,
+                   'exported_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+            cursor = conn.execute(f'''
+                SELECT c.seq, c.entity, c.entity_id, {columns}
+                FROM (
+                    SELECT entity, entity_id, MAX(seq) AS seq FROM (
+                        SELECT entity, entity_id, seq FROM change_log WHERE seq > ? AND seq <= ?
+                        UNION ALL
+                        SELECT l.entity, l.entity_id, l.seq
+                        FROM json_each(?) j
+                        JOIN change_log l ON l.entity = json_extract(j.value, '$[0]')
+                                         AND l.entity_id = json_extract(j.value, '$[1]')
+                        WHERE l.seq <= ?
+                    )
+                    GROUP BY entity, entity_id
+                ) c
+                {joins}
+                ORDER BY c.seq
+            ''', (since, last_seq, json.dumps([list(key) for key in include]), last_seq))
+            for row in cursor:
+                entity = row['entity']
+                if entity not in ENTITY_COLUMNS:
+                    continue
+                present = row[f'{entity}__present']
+                yield {
+                    'type': 'change',
+                    'seq': row['seq'],
+                    'entity': entity,
+                    'op': 'upsert' if present else 'delete',
+                    'id': row['entity_id'],
+                    'data': {column: row[f'{entity}__{column}'] for column in ENTITY_COLUMNS[entity]}
+                    if present else None,
+                }
+        finally:
+            conn.rollback()
+
+
+def export_changes(out, since=0):
+    """เขียนการเปลี่ยนแปลงหลัง seq since เป็น NDJSON ลง file object out คืนค่า (last_seq, จำนวนรายการ)"""
+    last_seq, count = since, 0
+    for record in iter_changes(since):
+        if record['type'] == 'header':
+            last_seq = record['last_seq']
+        else:
+            count += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return last_seq, count
+
+
+# ===== Apply =====
+
+def _upsert_sql(entity):
+    columns = ENTITY_COLUMNS[entity]
+    return f'''
+        INSERT INTO {entity} (id, {", ".join(columns)}) VALUES (?, {", ".join("?" for _ in columns)})
+        ON CONFLICT (id) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in columns)}
+    '''
+
+
+def _apply_change(conn, change):
+    entity = change['entity']
+    if change['op'] == 'delete':
+        conn.execute(f"DELETE FROM {entity} WHERE id = ?", (change['id'],))
+    else:
+        data = change['data']
+        conn.execute(_upsert_sql(entity), (change['id'], *(data.get(column) for column in ENTITY_COLUMNS[entity])))
+
+
+def _apply_each(conn, changes):
+    """แต่ละรายการอยู่ใน SAVEPOINT ของตัวเอง คืนค่า [(change, error), ...] ของรายการที่ล้มเหลว"""
+    failed = []
+    for change in changes:
+        conn.execute("SAVEPOINT apply_change")
+        try:
+            _apply_change(conn, change)
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK TO apply_change")
+            failed.append((change, str(e)))
+        conn.execute("RELEASE apply_change")
+    return failed
+
+
+def _apply_batch(changes):
+    """รันบน writer: คืนค่า [(change, error), ...] ของรายการที่ล้มเหลว"""
+    with database.transaction() as conn:
+        return _apply_each(conn, changes)
+
+
+def _park(conn, changes):
+    for entity, assignment in PARK_ASSIGNMENTS.items():
+        ids = [change['id'] for change in changes if change['entity'] == entity and change['op'] != 'delete']
+        if ids:
+            conn.execute(f"UPDATE {entity} SET {assignment} WHERE id IN (SELECT value FROM json_each(?))",
+                         (json.dumps(ids),))
+
+
+def _apply_deferred(changes):
+    """รันบน writer: ลองรายการที่เคยชนกันอีกครั้ง คืนค่า [(change, error), ...] ที่ยังล้มเหลว
+
+    ทำซ้ำทีละรายการจนไม่มีรายการใดสำเร็จเพิ่ม (ชนกันเป็นทอด) แล้วถ้ายังเหลือ ย้ายคีย์ unique
+    ของทุกแถวที่เหลือออกไปก่อนแล้วใช้ทั้งชุด (ชนกันเป็นวง เช่นสลับชื่อ) รายการที่ยังล้มเหลวชนกับแถว
+    ที่ไม่ได้มาจากต้นทาง: ยกเลิกชุดนั้น ตัดรายการเหล่านั้นออกแล้วลองส่วนที่เหลือใหม่
+    """
+    with database.transaction() as conn:
+        failed = _apply_each(conn, changes)
+        while failed and len(failed) < len(changes):
+            changes = [change for change, _ in failed]
+            failed = _apply_each(conn, changes)
+        rejected = []
+        pending = [change for change, _ in failed]
+        while pending:
+            conn.execute("SAVEPOINT park_changes")
+            _park(conn, pending)
+            failed = _apply_each(conn, pending)
+            if failed:
+                conn.execute("ROLLBACK TO park_changes")
+                rejected.extend(failed)
+                failed_ids = {id(change) for change, _ in failed}
+                pending = [change for change in pending if id(change) not in failed_ids]
+            else:
+                pending = []
+            conn.execute("RELEASE park_changes")
+        return rejected
+
+
+def _error(change, message):
+    return change.get('seq'), change.get('entity'), change.get('id'), message
+
+
+def apply_changes(records, path=None):
+    """นำ NDJSON (บรรทัด หรือ dict ที่ parse แล้ว) ไปใช้กับฐานข้อมูล path (ค่าเริ่มต้น: ไฟล์ปัจจุบัน)
+
+    records ถูกอ่านทีละรายการ (ส่ง file object หรือ generator ได้โดยไม่ต้องโหลดทั้งหมด)
+    รายการที่ล้มเหลวถูกเลื่อนไปลองใหม่หลังรายการอื่นทั้งหมด (ดู _apply_deferred) ถ้ามีรายการใหม่กว่า
+    ของแถวเดียวกันตามมา รายการเดิมถูกทิ้ง
+    คืนค่า ApplyResult — ชื่อซ้ำกับแถวอื่นของปลายทางที่ยังชนอยู่หลังลองใหม่ ถูกข้ามและรายงานใน errors
+    """
+    result = ApplyResult()
+    batch = []
+    deferred = {}
+
+    def flush():
+        if batch:
+            failed = database.get_writer(path).run(_apply_batch, list(batch))
+            for change in batch:
+                deferred.pop((change['entity'], change['id']), None)
+            for change, error in failed:
+                deferred[(change['entity'], change['id'])] = change
+            result.applied += len(batch) - len(failed)
+            batch.clear()
+
+    for record in records:
+        if isinstance(record, (str, bytes)):
+            if not record.strip():
+                continue
+            record = json.loads(record)
+        if record.get('type') == 'header':
+            result.last_seq = record['last_seq']
+        elif record.get('type') == 'change':
+            if record.get('entity') not in ENTITY_COLUMNS:
+                result.errors.append(_error(record, f"unknown entity '{record.get('entity')}'"))
+                continue
+            batch.append(record)
+            if len(batch) >= APPLY_BATCH_SIZE:
+                flush()
+    flush()
+    if deferred:
+        changes = sorted(deferred.values(), key=lambda change: change.get('seq') or 0)
+        failed = database.get_writer(path).run(_apply_deferred, changes)
+        result.applied += len(changes) - len(failed)
+        result.errors.extend(_error(change, error) for change, error in failed)
+    return result
+
+
+# ===== Sync ระหว่างสองไฟล์ =====
+
+def get_sync_cursor(source):
+    row = database.execute_query("SELECT seq FROM sync_cursor WHERE source = ?", (source,), fetch_one=True)
+    return row['seq'] if row else 0
+
+
+def get_sync_conflicts(source=None):
+    """รายการที่ sync มาแล้วยังชนกับแถวของปลายทาง (ทุกต้นทาง หรือเฉพาะ source) เรียงตาม seq"""
+    if source is None:
+        return database.execute_query("SELECT * FROM sync_conflict ORDER BY source, seq")
+    return database.execute_query("SELECT * FROM sync_conflict WHERE source = ? ORDER BY seq",
+                                  (os.path.abspath(source),))
+
+
+def _record_sync(source, cursor, errors):
+    """รันบน writer: บันทึก cursor และแทนที่รายการชนกันของ source ด้วย errors ใน transaction เดียว"""
+    with database.transaction() as conn:
+        conn.execute('''
+            INSERT INTO sync_cursor (source, seq) VALUES (?, ?)
+            ON CONFLICT (source) DO UPDATE SET seq = excluded.seq, synced_at = CURRENT_TIMESTAMP
+        ''', (source, cursor))
+        conflicts = [(entity, entity_id, seq, error) for seq, entity, entity_id, error in errors
+                     if entity in ENTITY_COLUMNS and entity_id is not None]
+        conn.execute('''
+            DELETE FROM sync_conflict WHERE source = ? AND NOT EXISTS (
+                SELECT 1 FROM json_each(?) j
+                WHERE json_extract(j.value, '$[0]') = sync_conflict.entity
+                  AND json_extract(j.value, '$[1]') = sync_conflict.entity_id
+            )
+        ''', (source, json.dumps([[entity, entity_id] for entity, entity_id, _, _ in conflicts])))
+        conn.executemany('''
+            INSERT INTO sync_conflict (source, entity, entity_id, seq, error) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (source, entity, entity_id) DO UPDATE
+            SET seq = excluded.seq, error = excluded.error, attempts = attempts + 1
+        ''', [(source, *conflict) for conflict in conflicts])
+
+
+def sync_from(source_path):
+    """นำการเปลี่ยนแปลงของ source_path ตั้งแต่ครั้งก่อนมาใช้กับฐานข้อมูลปัจจุบัน คืนค่า ApplyResult
+
+    อ่านจากต้นทางและเขียนลงปลายทางไปพร้อมกันทีละชุด แล้วเลื่อน cursor ไปถึง last_seq เสมอ
+    รายการที่ยังล้มเหลวถูกบันทึกใน sync_conflict (ดูได้จาก get_sync_conflicts) และถูกส่งซ้ำพร้อมกับ
+    การเปลี่ยนแปลงใหม่ใน sync ครั้งถัดไป จนกว่าจะสำเร็จ — ไม่วนส่งทุกอย่างหลังรายการนั้นซ้ำทั้งหมด
+    """
+    source = os.path.abspath(source_path)
+    target = database.get_db_path()
+    since = get_sync_cursor(source)
+    include = [(row['entity'], row['entity_id']) for row in get_sync_conflicts(source)]
+    with database.use_db_path(source_path):
+        result = apply_changes(iter_changes(since, include), path=target)
+    result.since = since
+    result.cursor = since if result.last_seq is None else result.last_seq
+    database.get_writer(target).run(_record_sync, source, result.cursor, result.errors)
+    return result
+
+
+# ===== Compact =====
+
+def _compact_range(start, end):
+    with database.transaction() as conn:
+        return conn.execute('''
+            DELETE FROM change_log WHERE seq > ? AND seq <= ? AND EXISTS (
+                SELECT 1 FROM change_log newer
+                WHERE newer.entity = change_log.entity AND newer.entity_id = change_log.entity_id
+                  AND newer.seq > change_log.seq
+            )
+        ''', (start, end)).rowcount
+
+
+def compact_change_log():
+    """ลบรายการที่มีรายการใหม่กว่าของแถวเดียวกันแล้ว (export ได้ผลเหมือนเดิมทุกค่า since) คืนค่าจำนวนที่ลบ
+
+    ทำทีละช่วง seq ขนาด COMPACT_CHUNK_SIZE ต่อคำขอเขียน
+    """
+    row = database.execute_query("SELECT MIN(seq) AS low, MAX(seq) AS high FROM change_log", fetch_one=True)
+    if row['low'] is None:
+        return 0
+    removed = 0
+    for start in range(row['low'] - 1, row['high'], COMPACT_CHUNK_SIZE):
+        removed += database.get_writer().run(_compact_range, start, start + COMPACT_CHUNK_SIZE)
+    return removed
+
+
+def change_log_stats():
+    """จำนวนรายการใน change_log เทียบกับจำนวนแถวปัจจุบัน (ใช้ตัดสินว่าควร compact หรือยัง)"""
+    return database.execute_query('''
+        SELECT (SELECT COUNT(*) FROM change_log) AS entries,
+               (SELECT COUNT(*) FROM items) + (SELECT COUNT(*) FROM master_data) AS rows,
+               (SELECT MAX(seq) FROM change_log) AS last_seq
+    ''', fetch_one=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export/นำเข้าการเปลี่ยนแปลงของแคตตาล็อกเป็น NDJSON")
+    parser.add_argument('--db', help="ไฟล์ฐานข้อมูล (ค่าเริ่มต้น: database.DB_PATH)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="ส่งออกการเปลี่ยนแปลงหลัง seq ที่ระบุ")
+    export.add_argument('--since', type=int, default=0)
+    export.add_argument('-o', '--output', help="ไฟล์ NDJSON (ค่าเริ่มต้น: stdout)")
+    apply = commands.add_parser('apply', help="นำไฟล์ NDJSON ไปใช้กับฐานข้อมูล")
+    apply.add_argument('input', help="ไฟล์ NDJSON หรือ - สำหรับ stdin")
+    sync = commands.add_parser('sync', help="ดึงการเปลี่ยนแปลงจากไฟล์ต้นทางตั้งแต่ครั้งก่อน")
+    sync.add_argument('source')
+    commands.add_parser('compact', help="ลบรายการที่ถูกแทนที่แล้วใน change_log")
+    args = parser.parse_args()
+
+    if args.db:
+        database.DB_PATH = args.db
+    database.init_database()
+    if args.command == 'export':
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            last_seq, count = export_changes(out, args.since)
+        finally:
+            if args.output:
+                out.close()
+        print(f"ส่งออก {count:,} รายการ (seq {args.since} → {last_seq})", file=sys.stderr)
+    elif args.command in ('apply', 'sync'):
+        if args.command == 'sync':
+            result = sync_from(args.source)
+        elif args.input == '-':
+            result = apply_changes(sys.stdin)
+        else:
+            with open(args.input, encoding='utf-8') as f:
+                result = apply_changes(f)
+        print(f"นำไปใช้ {result.applied:,} รายการ ถึง seq {result.last_seq}")
+        for seq, entity, entity_id, error in result.errors:
+            print(f"  seq {seq} {entity} #{entity_id}: {error}", file=sys.stderr)
+        if args.command == 'sync':
+            for row in get_sync_conflicts(args.source):
+                print(f"  ยังชนกัน: {row['entity']} #{row['entity_id']} (seq {row['seq']}, "
+                      f"ลองแล้ว {row['attempts']} ครั้ง ตั้งแต่ {row['first_seen']}): {row['error']}",
+                      file=sys.stderr)
+    else:
+        print(f"ลบ {compact_change_log():,} รายการ")
+    database.close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Schema แบบกะทัดรัด (สำหรับวัดผล): items เก็บ master_data.id เป็น integer แทนข้อความ
+
+ตาราง items ปัจจุบันเก็บข้อความเต็มของประเภท/ความหายาก/สถานที่ดรอป/Tier ซ้ำทุกแถว
+schema นี้เก็บเป็น id ของ master_data แทน (ตาราง items_compact) และมี view items_compact_view
+ที่คืนคอลัมน์หน้าตาเดียวกับ items เดิม จึงแปลงเป็น Item ได้ตรง ๆ — การเปลี่ยนชื่อค่า master data
+แก้เพียงแถวเดียวใน master_data
+
+ใช้วัดผลเท่านั้น ไม่ใช่ schema ที่แอปเปิดใช้ได้: convert() สร้างไฟล์ฐานข้อมูลใหม่จากไฟล์เดิม
+(ดู benchmarks/bench_compact_schema.py) ไฟล์ต้นฉบับไม่ถูกแก้ไข ไฟล์ที่ได้มีเพียง trigger ของ name_key
+(ชื่อซ้ำยังถูกปฏิเสธ) แต่ไม่มี items_fts, item_stats, change_log หรือ trigger ที่ดูแลตารางเหล่านั้น
+และ items_compact_view อ่านได้อย่างเดียว — ห้ามตั้ง database.DB_PATH หรือแคตตาล็อกให้ชี้ไฟล์นี้
+
+รัน:  python compact_schema.py item_wiki.db item_wiki_compact.db
+"""
+import argparse
+import os
+import sqlite3
+
+from database import normalize_name
+
+# คอลัมน์ข้อความใน items → (หมวดใน master_data, คอลัมน์ id ใน items_compact)
+REFERENCE_COLUMNS = (
+    ('type', 'type', 'type_id'),
+    ('rarity', 'rarity', 'rarity_id'),
+    ('drop_location', 'location', 'location_id'),
+    ('tier', 'tier', 'tier_id'),
+)
+
+COMPACT_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS master_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT NOT NULL,
+        value TEXT NOT NULL,
+        color TEXT,
+        sort_order INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(category, value)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS items_compact (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        name_key TEXT,
+        -- id ของ master_data: ไม่ประกาศ REFERENCES เพราะไม่มี connection ใดเปิด PRAGMA foreign_keys
+        -- ทุก id ชี้แถวที่มีอยู่จริงเพราะ migrate_items เพิ่มค่าที่ขาดเข้า master_data ก่อน JOIN
+        type_id INTEGER NOT NULL,
+        rarity_id INTEGER NOT NULL,
+        location_id INTEGER NOT NULL,
+        tier_id INTEGER NOT NULL,
+        description TEXT,
+        image_path TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_system INTEGER GENERATED ALWAYS AS (name LIKE '[%]%') VIRTUAL
+    )
+    ''',
+    # index ชุดเดียวกับ migration 3 และ 6 ของตาราง items (partial index เฉพาะแถวที่แสดง)
+    # เพื่อให้เทียบขนาดและเวลากันได้ — query ต้องมี database.VISIBLE_CONDITION เหมือนกันทั้งสองฝั่ง
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_name ON items_compact (name) WHERE is_system = 0",
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_type_name ON items_compact (type_id, name) WHERE is_system = 0",
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_rarity_name "
+    "ON items_compact (rarity_id, name) WHERE is_system = 0",
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_location_name "
+    "ON items_compact (location_id, name) WHERE is_system = 0",
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_tier_name ON items_compact (tier_id, name) WHERE is_system = 0",
+    "CREATE INDEX IF NOT EXISTS idx_items_compact_system_name ON items_compact (name) WHERE is_system = 1",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_items_compact_name_key ON items_compact (name_key)",
+    # เหมือน trigger ของ migration 3: แถวที่เขียนภายหลังได้ name_key เสมอ (connection ต้องมี normalize_name)
+    '''
+    CREATE TRIGGER IF NOT EXISTS items_compact_name_key_ai AFTER INSERT ON items_compact
+    BEGIN
+        UPDATE items_compact SET name_key = normalize_name(NEW.name) WHERE id = NEW.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS items_compact_name_key_au AFTER UPDATE OF name ON items_compact
+    WHEN NEW.name IS NOT OLD.name
+    BEGIN
+        UPDATE items_compact SET name_key = normalize_name(NEW.name) WHERE id = NEW.id;
+    END
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_master_data_category_order ON master_data (category, sort_order, value)",
+    '''
+    CREATE VIEW IF NOT EXISTS items_compact_view AS
+    SELECT i.id, i.name, t.value AS type, r.value AS rarity, l.value AS drop_location,
+           tr.value AS tier, i.description, i.image_path, i.created_at, i.updated_at
+    FROM items_compact i
+    JOIN master_data t ON t.id = i.type_id
+    JOIN master_data r ON r.id = i.rarity_id
+    JOIN master_data l ON l.id = i.location_id
+    JOIN master_data tr ON tr.id = i.tier_id
+    ''',
+]
+
+
+def reference_condition(column):
+    """เงื่อนไขกรองหลายค่าของ items_compact (รับ JSON array ของข้อความเหมือน repository)
+
+    แปลงข้อความเป็น id ผ่าน UNIQUE(category, value) ก่อน แล้วเทียบ integer กับ index
+    """
+    category, id_column = {text: (cat, col) for text, cat, col in REFERENCE_COLUMNS}[column]
+    return (f"{id_column} IN (SELECT id FROM master_data WHERE category = '{category}' "
+            f"AND value IN (SELECT value FROM json_each(?)))")
+
+
+def create_compact_schema(conn):
+    for statement in COMPACT_SCHEMA:
+        conn.execute(statement)
+
+
+def migrate_items(conn, source_schema='source'):
+    """คัดลอก master_data และ items จาก schema ต้นทาง (ATTACH ไว้แล้ว) มาเป็นแบบ integer key
+
+    ค่าข้อความที่ไอเท็มใช้อยู่แต่ไม่มีใน master_data จะถูกเพิ่มเข้า master_data ให้ก่อน
+    """
+    conn.execute(f'''
+        INSERT OR IGNORE INTO master_data (id, category, value, color, sort_order, created_at)
+        SELECT id, category, value, color, sort_order, created_at FROM {source_schema}.master_data
+    ''')
+    for text_column, category, _ in REFERENCE_COLUMNS:
+        conn.execute(f'''
+            INSERT OR IGNORE INTO master_data (category, value, sort_order)
+            SELECT DISTINCT '{category}', {text_column}, 999 FROM {source_schema}.items
+        ''')
+    joins = "\n".join(
+        f"JOIN master_data m_{category} ON m_{category}.category = '{category}' "
+        f"AND m_{category}.value = i.{text_column}"
+        for text_column, category, _ in REFERENCE_COLUMNS
+    )
+    conn.execute(f'''
+        INSERT INTO items_compact (id, name, name_key, type_id, rarity_id, location_id, tier_id,
+                                   description, image_path, created_at, updated_at)
+        SELECT i.id, i.name, i.name_key, m_type.id, m_rarity.id, m_location.id, m_tier.id,
+               i.description, i.image_path, i.created_at, i.updated_at
+        FROM {source_schema}.items i
+        {joins}
+        ORDER BY i.id
+    ''')
+
+
+def convert(source_path, target_path):
+    """สร้างไฟล์ target_path ที่ใช้ schema แบบกะทัดรัดจากไฟล์ source_path คืนค่าจำนวนไอเท็มที่คัดลอก
+
+    ไฟล์ต้นทางต้องผ่าน migrations แล้ว (ใช้คอลัมน์ name_key จาก migration 3)
+    """
+    if os.path.exists(target_path):
+        raise FileExistsError(target_path)
+    conn = sqlite3.connect(target_path, isolation_level=None)
+    conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+        conn.execute("BEGIN")
+        create_compact_schema(conn)
+        migrate_items(conn)
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        return conn.execute("SELECT COUNT(*) FROM items_compact").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def object_sizes(conn, table):
+    """ขนาด (ไบต์) ของตารางและ index ของตารางนั้นจาก dbstat: {'table': n, 'indexes': n}"""
+    rows = conn.execute('''
+        SELECT s.name = ? AS is_table, SUM(s.pgsize)
+        FROM dbstat s JOIN sqlite_schema m ON m.name = s.name
+        WHERE m.tbl_name = ?
+        GROUP BY is_table
+    ''', (table, table)).fetchall()
+    sizes = {'table': 0, 'indexes': 0}
+    for is_table, size in rows:
+        sizes['table' if is_table else 'indexes'] = size
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="แปลงฐานข้อมูลเป็น schema แบบ integer foreign key")
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+
+    count = convert(args.source, args.target)
+    source = sqlite3.connect(args.source)
+    target = sqlite3.connect(args.target)
+    before, after = object_sizes(source, 'items'), object_sizes(target, 'items_compact')
+    print(f"คัดลอก {count:,} ไอเท็ม")
+    print(f"items:         table {before['table']:>12,} B  indexes {before['indexes']:>12,} B")
+    print(f"items_compact: table {after['table']:>12,} B  indexes {after['indexes']:>12,} B")
+
+
+if __name__ == "__main__":
+    main()
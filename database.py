@@ -1,18 +1,333 @@
 import sqlite3
 import os
+import re
+import sys
+import json
+import logging
+import queue
+import threading
+import time
+import unicodedata
+import contextlib
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
+from functools import lru_cache
+from itertools import count
+
+from migrations import run_migrations
+from models import DeleteProgress, Page, QueryRecord, RowResult
 
 DB_PATH = "item_wiki.db"
 
+# ===== Connection Pool =====
+# เปิด connection ค้างไว้ใช้ซ้ำแทนการ connect/close ทุกครั้งที่รัน query
+POOL_SIZE = 8               # จำนวน connection สูงสุดต่อไฟล์ฐานข้อมูล
+MAX_OPEN_DATABASES = 8      # ไฟล์ที่เปิดค้างไว้พร้อมกัน (pool/writer/snapshot) เกินนี้ไฟล์ที่ไม่ได้ใช้นานสุดถูกปิด
+POOL_TIMEOUT = 30           # วินาทีที่ยอมรอ connection ว่าง
+BUSY_TIMEOUT = 5            # วินาทีที่ SQLite รอเมื่อฐานข้อมูลถูกล็อก
+STATEMENT_CACHE_SIZE = 256  # จำนวน prepared statement ที่ cache ไว้ต่อ connection
+
+# ตั้งเฉพาะตอนไฟล์ยังว่าง (ก่อน journal_mode) ไฟล์เดิมต้อง VACUUM ก่อน ดู maintenance.py
+# ห้ามรันกับทุก connection: คำสั่งนี้ต้องใช้ write lock จึงรอ (แล้วล้มเหลว) ถ้ามีการเขียนค้างอยู่
+NEW_DATABASE_PRAGMAS = (
+    "PRAGMA auto_vacuum = INCREMENTAL",
+)
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # ~16MB ต่อ connection
+    "PRAGMA mmap_size = 268435456",    # 256MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+# เครื่องหมายบน/ล่างของไทย: สระ (ั ิ ี ึ ื ุ ู ฺ ็) ก่อน วรรณยุกต์ (่ ้ ๊ ๋) ก่อน ์ ํ ๎
+# NFKC ไม่จัดลำดับให้ เพราะสระบนมี combining class 0 (วรรณยุกต์ 107) จึงต้องเรียงเอง
+_THAI_MARK_RANK = {
+    **{chr(code): 0 for code in (0x0E31, *range(0x0E34, 0x0E3B), 0x0E47)},
+    **{chr(code): 1 for code in range(0x0E48, 0x0E4C)},
+    **{chr(code): 2 for code in range(0x0E4C, 0x0E4F)},
+}
+_THAI_MARK_RUN = re.compile('[' + ''.join(_THAI_MARK_RANK) + ']{2,}')
+_THAI_TONE_AFTER_SARA_AM = re.compile('\u0E33([\u0E48-\u0E4B])')
+
+
+def _reorder_thai_marks(text):
+    # วรรณยุกต์ที่พิมพ์หลัง ำ (เช่น น ำ ้) ย้ายไปก่อน ำ ให้เหมือน น ้ ำ
+    text = _THAI_TONE_AFTER_SARA_AM.sub('\\1\u0E33', text)
+    return _THAI_MARK_RUN.sub(lambda run: ''.join(sorted(run.group(), key=_THAI_MARK_RANK.get)), text)
+
+
+def normalize_name(name):
+    """แปลงชื่อไอเท็มเป็นคีย์สำหรับเทียบชื่อซ้ำ (ตัดช่องว่าง, ไม่สนตัวพิมพ์, Unicode NFKC)
+
+    สระ/วรรณยุกต์ไทยที่พิมพ์สลับลำดับกันถูกเรียงใหม่ก่อน NFKC (ซึ่งแยก ำ เป็น ํ + า)
+    """
+    if name is None:
+        return None
+    text = unicodedata.normalize('NFKC', _reorder_thai_marks(str(name).strip()))
+    return unicodedata.normalize('NFKC', text.casefold())
+
+
+def _open_connection(path):
+    """เปิด connection ใหม่พร้อมตั้งค่า PRAGMA สำหรับการใช้งานจริง"""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        uri=path.startswith("file:"),  # snapshot ใน memory เปิดด้วย URI (ดู ReadSnapshot)
+    )
+    conn.row_factory = sqlite3.Row
+    # ใช้ใน trigger ที่ดูแลคอลัมน์ items.name_key
+    conn.create_function("normalize_name", 1, normalize_name, deterministic=True)
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        for pragma in NEW_DATABASE_PRAGMAS:
+            conn.execute(pragma)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Pool ของ connection ที่ใช้ซ้ำได้
+
+    ระหว่างที่ใช้งาน connection จะผูกอยู่กับ thread ที่ยืมไป (script thread ของ Streamlit)
+    การเรียก get_db_connection ซ้อนกันใน thread เดียวกันจะได้ connection เดิม
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'reentrant': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+        }
+
+    def acquire(self):
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            with self._cond:
+                self._stats['reentrant'] += 1
+            return held
+
+        conn = None
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats['hits'] += 1
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    self._stats['misses'] += 1
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted ({self.size} connections in use)")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                elapsed = time.perf_counter() - start
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += elapsed
+                self._stats['max_wait'] = max(self._stats['max_wait'], elapsed)
+
+        if conn is None:
+            try:
+                conn = _open_connection(self.path)
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+
+        # งานที่ยังไม่ commit จะไม่ติดไปถึงผู้ยืมคนถัดไป (เหมือนตอน close connection)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def in_use(self):
+        """จำนวน connection ที่ถูกยืมอยู่"""
+        with self._cond:
+            return self._open - len(self._idle)
+
+    def close(self):
+        """ปิด connection ที่ว่างอยู่ทั้งหมด (connection ที่ถูกยืมจะถูกปิดเมื่อคืน)"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['size'] = self.size
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        stats['wait_time_ms'] = round(stats.pop('wait_time') * 1000, 3)
+        stats['max_wait_ms'] = round(stats.pop('max_wait') * 1000, 3)
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_last_used = {}  # path → time.monotonic() ที่ถูกใช้ล่าสุด (เลือกไฟล์ที่จะปิดเมื่อเปิดเกิน MAX_OPEN_DATABASES)
+
+
+_db_path_override = threading.local()
+
+
+def get_db_path():
+    """path ของไฟล์ฐานข้อมูลที่ใช้งานอยู่ (ของ thread นี้ ถ้าถูกกำหนดด้วย use_db_path)"""
+    return getattr(_db_path_override, 'path', None) or DB_PATH
+
+
+def set_db_path(path):
+    """กำหนดไฟล์ของ thread ปัจจุบันจนกว่าจะเปลี่ยนอีก (None = DB_PATH) ใช้ตอนต้นของแต่ละ rerun"""
+    _db_path_override.path = path
+
+
+@contextmanager
+def use_db_path(path):
+    """ให้ query ใน thread ปัจจุบันใช้ไฟล์ path ชั่วคราว"""
+    previous = getattr(_db_path_override, 'path', None)
+    _db_path_override.path = path
+    try:
+        yield
+    finally:
+        _db_path_override.path = previous
+
+
+def get_pool(path=None):
+    """ดึง pool ของไฟล์ฐานข้อมูล (สร้างใหม่ถ้ายังไม่มี และปิดไฟล์ที่ไม่ได้ใช้นานสุดถ้าเปิดเกินกำหนด)"""
+    path = path or get_db_path()
+    _last_used[path] = time.monotonic()
+    pool = _pools.get(path)
+    if pool is None:
+        victims = []
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = ConnectionPool(path)
+                _pools[path] = pool
+                victims = _eviction_candidates(path)
+        for victim in victims:
+            close_database(victim)
+    return pool
+
+
+def _eviction_candidates(keep):
+    """ไฟล์ที่ควรปิดให้เหลือไม่เกิน MAX_OPEN_DATABASES (เฉพาะ pool ที่ไม่มีใครยืม connection อยู่)"""
+    excess = len(_pools) - MAX_OPEN_DATABASES
+    if excess <= 0:
+        return []
+    idle = [path for path, pool in _pools.items() if path != keep and pool.in_use() == 0]
+    idle.sort(key=lambda path: _last_used.get(path, 0))
+    return idle[:excess]
+
+
+def close_database(path):
+    """ปิดทุกอย่างของไฟล์เดียว (writer, snapshot, watcher, pool) ถูกเปิดใหม่อัตโนมัติเมื่อใช้อีก"""
+    with _writers_lock:
+        writer = _writers.pop(path, None)
+    if writer is not None:
+        writer.close()
+    with _snapshots_lock:
+        snapshot = _snapshots.pop(path, None)
+    if snapshot is not None:
+        snapshot.close()
+    with _watchers_lock:
+        watcher = _watchers.pop(path, None)
+    if watcher is not None:
+        watcher.close()
+    with _pools_lock:
+        pool = _pools.pop(path, None)
+    if pool is not None:
+        pool.close()
+    _last_used.pop(path, None)
+
+
+def get_open_databases():
+    """ไฟล์ที่มี pool เปิดอยู่ เรียงจากที่ใช้ล่าสุด"""
+    return sorted(_pools, key=lambda path: _last_used.get(path, 0), reverse=True)
+
+
+def get_pool_stats(path=None):
+    """สถิติของ pool: hits/misses, จำนวนครั้งที่ต้องรอ และเวลารอรวม"""
+    return get_pool(path).stats()
+
+
+def close_all_pools():
+    """ปิด connection ทั้งหมดในทุก pool (หยุด writer thread, ปิด snapshot และ watcher ของแต่ละไฟล์ก่อน)"""
+    close_all_writers()
+    close_all_snapshots()
+    close_all_watchers()
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _last_used.clear()
+    for pool in pools:
+        pool.close()
+
 
 @contextmanager
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    pool = get_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 def init_database():
@@ -90,43 +405,1110 @@ def init_database():
 
         conn.commit()
 
+        # ✅ อัปเกรดโครงสร้างฐานข้อมูลเดิมให้เป็นเวอร์ชันล่าสุด (index ฯลฯ)
+        run_migrations(conn)
+
+
+# ===== วัดเวลา Query =====
+# ทุก statement ที่ผ่าน execute_query / iter_query / execute_many ถูกบันทึกลง ring buffer
+# (รูปแบบ SQL, เวลา, จำนวนแถว, จุดที่เรียก, หน้าที่กำลัง render)
+# statement ที่ช้ากว่า SLOW_QUERY_MS ถูกเขียนลง logger "item_wiki.slow_query" พร้อม EXPLAIN QUERY PLAN
+
+QUERY_LOG_SIZE = 2000  # จำนวน statement ล่าสุดที่เก็บไว้
+SLOW_QUERY_MS = 100    # เกณฑ์ query ช้า (มิลลิวินาที), None = ไม่บันทึก slow log
+
+slow_query_logger = logging.getLogger("item_wiki.slow_query")
+
+_query_log = deque(maxlen=QUERY_LOG_SIZE)
+_query_log_lock = threading.Lock()
+_query_context = threading.local()
+_render_ids = count(1)
+# ชั้นที่ห่อ database.py (repository, async_db, utils) ถูกข้ามด้วย จุดที่รายงานจึงเป็นหน้าที่เรียกใช้
+_INTERNAL_FILES = {__file__, contextlib.__file__} | {
+    os.path.join(os.path.dirname(__file__), name) for name in ('repository.py', 'async_db.py', 'utils.py')
+}
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(query):
+    """SQL ที่ตัดช่องว่างซ้ำออก ใช้เป็น key รวมสถิติของ statement เดียวกัน"""
+    return " ".join(query.split())
+
+
+def start_page_render(page):
+    """เริ่มนับ query ของการ render หน้า page หนึ่งครั้ง (app.py เรียกทุก rerun)"""
+    _query_context.page = page
+    _query_context.render = next(_render_ids)
+
+
+def _call_site():
+    """ไฟล์:บรรทัด ของโค้ดนอก database.py ที่สั่งรัน query"""
+    # งานที่รันบน writer thread ใช้จุดที่เรียกของผู้ส่งคำขอ (ดู WriteCoordinator)
+    submitted_from = getattr(_query_context, 'call_site', None)
+    if submitted_from:
+        return submitted_from
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+@contextmanager
+def use_call_site(call_site):
+    """ให้ query ใน thread นี้รายงานจุดที่เรียกเป็น call_site (ใช้เมื่อส่งงานไปรันบน thread อื่น)"""
+    previous = getattr(_query_context, 'call_site', None)
+    _query_context.call_site = call_site
+    try:
+        yield
+    finally:
+        _query_context.call_site = previous
+
+
+def _record_query(conn, query, params, duration_ms, rows):
+    record = QueryRecord(
+        shape=statement_shape(query),
+        duration_ms=duration_ms,
+        rows=rows,
+        call_site=_call_site(),
+        page=getattr(_query_context, 'page', None),
+        render=getattr(_query_context, 'render', 0),
+    )
+    with _query_log_lock:
+        _query_log.append(record)
+    if SLOW_QUERY_MS is not None and duration_ms >= SLOW_QUERY_MS:
+        _log_slow_query(conn, query, params, record)
+
+
+def _log_slow_query(conn, query, params, record):
+    try:
+        plan = "\n".join(f"    {row[3]}" for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+    except sqlite3.Error as e:
+        plan = f"    (EXPLAIN QUERY PLAN ไม่สำเร็จ: {e})"
+    slow_query_logger.warning(
+        "slow query %.1fms rows=%s page=%s at %s\n  %s\n%s",
+        record.duration_ms, record.rows, record.page, record.call_site, record.shape, plan,
+    )
+
+
+def get_query_log(limit=None):
+    """QueryRecord ล่าสุด (เก่าไปใหม่) จาก ring buffer"""
+    with _query_log_lock:
+        records = list(_query_log)
+    return records[-limit:] if limit else records
+
+
+def clear_query_log():
+    with _query_log_lock:
+        _query_log.clear()
+
+
+def get_query_stats(page=None, top=5):
+    """สรุปต่อหน้าจาก ring buffer เรียงตามเวลา DB รวม
+
+    คืนค่า list ของ {'page', 'renders', 'queries', 'total_ms', 'queries_per_render',
+    'ms_per_render', 'top': [{'shape', 'calls', 'total_ms', 'max_ms', 'rows', 'call_sites'}]}
+    """
+    pages = {}
+    for record in get_query_log():
+        if page is not None and record.page != page:
+            continue
+        summary = pages.setdefault(record.page, {'renders': set(), 'queries': 0, 'total_ms': 0.0, 'statements': {}})
+        summary['renders'].add(record.render)
+        summary['queries'] += 1
+        summary['total_ms'] += record.duration_ms
+        statement = summary['statements'].setdefault(record.shape, {
+            'shape': record.shape, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'call_sites': set(),
+        })
+        statement['calls'] += 1
+        statement['total_ms'] += record.duration_ms
+        statement['max_ms'] = max(statement['max_ms'], record.duration_ms)
+        statement['rows'] += record.rows
+        statement['call_sites'].add(record.call_site)
+
+    results = []
+    for name, summary in pages.items():
+        renders = len(summary['renders'])
+        statements = sorted(summary['statements'].values(), key=lambda s: s['total_ms'], reverse=True)[:top]
+        for statement in statements:
+            statement['call_sites'] = sorted(statement['call_sites'])
+        results.append({
+            'page': name,
+            'renders': renders,
+            'queries': summary['queries'],
+            'total_ms': summary['total_ms'],
+            'queries_per_render': summary['queries'] / renders,
+            'ms_per_render': summary['total_ms'] / renders,
+            'top': statements,
+        })
+    results.sort(key=lambda r: r['total_ms'], reverse=True)
+    return results
+
+
+def _is_read(query):
+    return query.strip().upper().startswith('SELECT')
+
 
 def execute_query(query, params=(), fetch_one=False):
-    """รันคำสั่ง SQL และคืนค่าผลลัพธ์"""
-    with get_db_connection() as conn:
+    """รันคำสั่ง SQL และคืนค่าผลลัพธ์ (คำสั่งเขียนถูกส่งไปรันบน writer thread ของไฟล์นั้น)"""
+    read = _is_read(query)
+    if not read and _should_queue_write():
+        return get_writer().run(execute_query, query, params, fetch_one)
+
+    with _read_connection() if read else get_db_connection() as conn:
+        started = time.perf_counter()
         cursor = conn.cursor()
         cursor.execute(query, params)
 
-        if query.strip().upper().startswith('SELECT'):
+        if read:
             if fetch_one:
-                return cursor.fetchone()
-            return cursor.fetchall()
+                result = cursor.fetchone()
+                rows = 0 if result is None else 1
+            else:
+                result = cursor.fetchall()
+                rows = len(result)
         else:
-            conn.commit()
-            return cursor.lastrowid
+            # อยู่ใน transaction() → ให้ transaction เป็นผู้ commit ตอนจบ
+            if not in_transaction(conn):
+                conn.commit()
+            result, rows = cursor.lastrowid, cursor.rowcount
+
+        _record_query(conn, query, params, (time.perf_counter() - started) * 1000, rows)
+        return result
+
+
+def iter_query(query, params=(), batch_size=None, arraysize=500):
+    """อ่านผลลัพธ์ทีละแถวจาก cursor โดยไม่โหลดทั้งหมดเข้าหน่วยความจำ
+
+    batch_size=None → yield ทีละแถว, ระบุ batch_size → yield เป็น list ขนาดไม่เกิน batch_size
+    connection ถูกยืมจาก pool เฉพาะระหว่างที่ยังวนอ่านอยู่ ถ้าเลิกอ่านกลางทาง
+    ให้ปิด generator (ใช้ contextlib.closing) เพื่อคืน connection ทันที
+    """
+    with _read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.arraysize = batch_size or arraysize
+        elapsed, total_rows = 0.0, 0  # นับเฉพาะเวลาใน SQLite ไม่รวมเวลาที่ผู้เรียกประมวลผลแต่ละชุด
+        try:
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany()
+                elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                total_rows += len(rows)
+                if batch_size:
+                    yield rows
+                else:
+                    yield from rows
+                started = time.perf_counter()
+        finally:
+            cursor.close()
+            _record_query(conn, query, params, elapsed * 1000, total_rows)
+
+
+# ===== Transaction และการเขียนหลายแถว =====
+# เขียนหลายคำสั่งใน transaction เดียว = fsync ครั้งเดียว แทนการ commit ทีละแถว
+
+_transactions = threading.local()
+
+
+def _transaction_depths():
+    if not hasattr(_transactions, 'depths'):
+        _transactions.depths = {}
+    return _transactions.depths
+
+
+def in_transaction(conn):
+    """connection นี้อยู่ใน transaction() ของ thread ปัจจุบันหรือไม่"""
+    return _transaction_depths().get(id(conn), 0) > 0
+
+
+@contextmanager
+def transaction():
+    """รวมหลายคำสั่งให้ commit พร้อมกันครั้งเดียว (เรียกซ้อนกันได้ ชั้นในใช้ SAVEPOINT)
+
+    with transaction():
+        execute_query(...)
+        execute_query(...)
+    """
+    with get_db_connection() as conn:
+        depths = _transaction_depths()
+        depth = depths.get(id(conn), 0)
+        savepoint = None
+        if depth == 0 and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            savepoint = f"sp_{depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+        depths[id(conn)] = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if savepoint:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.rollback()
+            raise
+        else:
+            if savepoint:
+                conn.execute(f"RELEASE {savepoint}")
+            else:
+                conn.commit()
+        finally:
+            if depth:
+                depths[id(conn)] = depth
+            else:
+                depths.pop(id(conn), None)
+
+
+def execute_many(query, rows):
+    """รันคำสั่งเดียวกันกับข้อมูลหลายแถวใน transaction เดียว
+
+    แต่ละแถวอยู่ใน SAVEPOINT ของตัวเอง แถวที่ผิดพลาดจะถูกย้อนกลับเฉพาะแถวนั้น
+    คืนค่ารายการ RowResult (ลำดับแถว, lastrowid, error) เรียงตามแถวที่ส่งเข้ามา
+    """
+    if _should_queue_write():
+        return get_writer().run(execute_many, query, list(rows))
+
+    results = []
+    with transaction() as conn:
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        for index, params in enumerate(rows):
+            if index == 0:
+                first_params = params  # rows อาจเป็น generator: เก็บไว้ใช้กับ EXPLAIN ของ slow log
+            conn.execute("SAVEPOINT batch_row")
+            try:
+                cursor.execute(query, params)
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK TO batch_row")
+                results.append(RowResult(index=index, error=e))
+            else:
+                results.append(RowResult(index=index, lastrowid=cursor.lastrowid))
+            conn.execute("RELEASE batch_row")
+        if results:
+            _record_query(conn, query, first_params, (time.perf_counter() - started) * 1000, len(results))
+    return results
+
+
+# ===== ตรวจจับการเปลี่ยนแปลง (ข้าม process) =====
+# ตาราง catalog_revision (migration 7) มี revision ต่อขอบเขต: 'items', 'master_data' และ 'catalog' (ทั้งสองอย่าง)
+# trigger เพิ่มค่าทุกครั้งที่มีการเขียน ไม่ว่าจาก connection หรือ process ใด
+# ChangeWatcher อ่าน PRAGMA data_version ก่อน (ค่าเปลี่ยนเมื่อ connection อื่น commit) และอ่านตาราง
+# revision ใหม่เฉพาะเมื่อค่านั้นเปลี่ยน การถาม "เปลี่ยนไปจาก revision N หรือยัง" จึงแทบไม่มีต้นทุน
+
+REVISION_SCOPES = ('catalog', 'items', 'master_data')
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class ChangeWatcher:
+    """connection เฉพาะที่ไม่เคยเขียน ใช้ตรวจว่าไฟล์ฐานข้อมูลถูกแก้ไขหรือไม่"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _open_connection(path)
+        self._data_version = None
+        self._revisions = {}
+
+    def data_version(self):
+        """ค่าที่เปลี่ยนทุกครั้งที่ connection อื่น (รวมถึง process อื่น) commit ลงไฟล์นี้"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def revisions(self):
+        """{ขอบเขต: revision} ล่าสุด (อ่านตารางใหม่เฉพาะเมื่อ data_version เปลี่ยน)"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                rows = self._conn.execute("SELECT scope, revision FROM catalog_revision").fetchall()
+                self._revisions = {row['scope']: row['revision'] for row in rows}
+                self._data_version = version
+            return self._revisions
+
+    def revision(self, scope='catalog'):
+        return self.revisions().get(scope, 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_change_watcher(path=None):
+    path = path or get_db_path()
+    watcher = _watchers.get(path)
+    if watcher is None:
+        with _watchers_lock:
+            watcher = _watchers.get(path)
+            if watcher is None:
+                watcher = ChangeWatcher(path)
+                _watchers[path] = watcher
+    return watcher
+
+
+def get_data_version(path=None):
+    """PRAGMA data_version ของไฟล์ (เปลี่ยนเมื่อมีการ commit จากที่อื่น รวมถึงตารางที่ไม่ใช่แคตตาล็อก)"""
+    return get_change_watcher(path).data_version()
+
+
+def get_catalog_revision(scope='catalog', path=None):
+    """revision ปัจจุบันของขอบเขต ('catalog', 'items' หรือ 'master_data') เพิ่มขึ้นเสมอเมื่อข้อมูลเปลี่ยน"""
+    return get_change_watcher(path).revision(scope)
+
+
+def has_changed_since(revision, scope='catalog', path=None):
+    """ข้อมูลในขอบเขตนี้เปลี่ยนไปจาก revision ที่ผู้เรียกเก็บไว้หรือไม่"""
+    return get_catalog_revision(scope, path) != revision
+
+
+def close_all_watchers():
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.close()
+
+
+# ===== Snapshot สำหรับอ่าน (in-memory) =====
+# ภายใน with read_snapshot(): คำสั่ง SELECT ทั้งหมดอ่านจากสำเนาของไฟล์ฐานข้อมูลใน memory
+# (คัดลอกด้วย backup API เป็นฐานข้อมูล shared-cache ที่ทุก connection ของ snapshot ใช้ร่วมกัน)
+# ทุกครั้งที่อ่านจะเทียบ catalog revision (ChangeWatcher) ถ้าข้อมูลเปลี่ยนจะโหลด snapshot ใหม่เบื้องหลัง
+# โหลดใหม่ได้ไม่ถี่กว่าทุก SNAPSHOT_MIN_INTERVAL วินาที (หรือ 4 เท่าของเวลาโหลดครั้งล่าสุด ถ้านานกว่า)
+# เพื่อไม่ให้ช่วงที่มีการเขียนต่อเนื่องกลายเป็นการคัดลอกทั้งไฟล์ตลอดเวลา
+# ถ้าโหลดใหม่ได้ทันที ผู้อ่านรอได้ไม่เกิน SNAPSHOT_REFRESH_WAIT วินาที นอกนั้นอ่านจาก snapshot เดิมไปก่อน
+# การเขียน, งานใน transaction() และงานบน writer thread อ่านจากไฟล์จริงเสมอ
+
+READ_SNAPSHOT_ENABLED = True
+SNAPSHOT_REFRESH_WAIT = 0.2  # วินาทีที่ผู้อ่านรอ snapshot ใหม่ก่อนอ่านจากชุดเดิม
+SNAPSHOT_MIN_INTERVAL = 1.0  # วินาทีขั้นต่ำระหว่างการเริ่มโหลด snapshot แต่ละครั้ง
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+_snapshot_ids = count(1)
+
+
+class _SnapshotState:
+    """ฐานข้อมูลใน memory หนึ่งชุด (anchor ทำให้ข้อมูลอยู่จนกว่าจะปิด)"""
+
+    def __init__(self, uri, anchor, version, started, load_time):
+        self.uri = uri
+        self.anchor = anchor
+        self.version = version
+        self.pool = ConnectionPool(uri)
+        self.started = started      # time.perf_counter() ตอนเริ่มโหลด
+        self.load_time = load_time  # วินาทีที่ใช้คัดลอก
+        self.loaded_at = time.time()
+        self.users = 0
+        self.retired = False
+
+    def close(self):
+        self.pool.close()
+        self.anchor.close()
+
+
+class ReadSnapshot:
+    """สำเนาสำหรับอ่านของไฟล์ฐานข้อมูลหนึ่งไฟล์"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._watcher = get_change_watcher(path)
+        self._refreshing = None
+        self._stats = {'reads': 0, 'stale_reads': 0, 'refreshes': 0, 'refresh_time': 0.0, 'last_refresh_time': 0.0}
+        self._current = self._load()
+
+    def _revision(self):
+        """revision ของข้อมูลแคตตาล็อก (ไม่นับการเขียนตารางอื่น เช่น log หรือ ANALYZE)"""
+        return self._watcher.revision('catalog')
+
+    def _load(self):
+        started = time.perf_counter()
+        version = self._revision()
+        uri = f"file:item_wiki_snapshot_{next(_snapshot_ids)}?mode=memory&cache=shared"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(self.path)
+        try:
+            source.backup(anchor)
+        finally:
+            source.close()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['refreshes'] += 1
+            self._stats['refresh_time'] += elapsed
+            self._stats['last_refresh_time'] = elapsed
+        return _SnapshotState(uri, anchor, version, started, elapsed)
+
+    def _refresh_delay(self):
+        """วินาทีที่ต้องรอก่อนเริ่มโหลดครั้งถัดไปได้"""
+        current = self._current
+        interval = max(SNAPSHOT_MIN_INTERVAL, 4 * current.load_time)
+        return max(0.0, current.started + interval - time.perf_counter())
+
+    def _refresh(self, done, delay):
+        try:
+            if delay:
+                time.sleep(delay)
+            state = self._load()
+            with self._lock:
+                old, self._current = self._current, state
+                old.retired = True
+                close_old = old.users == 0
+            if close_old:
+                old.close()
+        finally:
+            with self._lock:
+                self._refreshing = None
+            done.set()
+
+    def _ensure_fresh(self):
+        if self._revision() == self._current.version:
+            return
+        with self._lock:
+            delay = self._refresh_delay()
+            done = self._refreshing
+            if done is None:
+                done = self._refreshing = threading.Event()
+                threading.Thread(target=self._refresh, args=(done, delay), name="item-wiki-snapshot",
+                                 daemon=True).start()
+        if delay or not done.wait(SNAPSHOT_REFRESH_WAIT):
+            with self._lock:
+                self._stats['stale_reads'] += 1
+
+    @contextmanager
+    def connection(self):
+        self._ensure_fresh()
+        with self._lock:
+            state = self._current
+            state.users += 1
+            self._stats['reads'] += 1
+        conn = state.pool.acquire()
+        try:
+            yield conn
+        finally:
+            state.pool.release(conn)
+            with self._lock:
+                state.users -= 1
+                close_state = state.retired and state.users == 0
+            if close_state:
+                state.close()
+
+    def close(self):
+        with self._lock:
+            state = self._current
+            state.retired = True
+            close_state = state.users == 0
+        if close_state:
+            state.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['version'] = self._current.version
+            stats['age'] = time.time() - self._current.loaded_at
+            stats['refreshing'] = self._refreshing is not None
+        return stats
+
+
+def get_snapshot(path=None):
+    """snapshot ของไฟล์ฐานข้อมูล (โหลดครั้งแรกที่เรียกใช้)"""
+    path = path or get_db_path()
+    _last_used[path] = time.monotonic()
+    snapshot = _snapshots.get(path)
+    if snapshot is None:
+        with _snapshots_lock:
+            snapshot = _snapshots.get(path)
+            if snapshot is None:
+                snapshot = ReadSnapshot(path)
+                _snapshots[path] = snapshot
+    return snapshot
+
+
+def get_snapshot_stats(path=None):
+    """จำนวนการอ่าน, การอ่านที่ได้ข้อมูลเก่า และเวลาโหลด snapshot (วินาที)"""
+    return get_snapshot(path).stats()
+
+
+def close_all_snapshots():
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+        _snapshots.clear()
+    for snapshot in snapshots:
+        snapshot.close()
+
+
+@contextmanager
+def read_snapshot(enabled=True):
+    """ให้คำสั่ง SELECT ใน thread นี้อ่านจาก snapshot ใน memory (เรียกซ้อนกันได้)
+
+    read_snapshot(False) ภายใน with อื่นบังคับให้อ่านจากไฟล์จริงชั่วคราว
+    """
+    previous = getattr(_query_context, 'snapshot', False)
+    _query_context.snapshot = enabled
+    try:
+        yield
+    finally:
+        _query_context.snapshot = previous
+
+
+def _read_connection():
+    """connection สำหรับ SELECT: snapshot ถ้าเปิดใช้และไม่ได้อยู่ระหว่างเขียน, นอกนั้นไฟล์จริง"""
+    if (READ_SNAPSHOT_ENABLED and getattr(_query_context, 'snapshot', False)
+            and not getattr(_query_context, 'writer', False) and not any(_transaction_depths().values())):
+        return get_snapshot().connection()
+    return get_db_connection()
+
+
+# ===== คิวการเขียน (single writer) =====
+# ทุก session ส่งคำสั่งเขียนเข้าคิวของไฟล์ฐานข้อมูล แทนการแย่ง write lock กันเอง
+# writer thread เดียวต่อไฟล์ดึงคำขอทีละชุด (ไม่เกิน WRITE_BATCH_SIZE) มารันใน transaction เดียว
+# แต่ละคำขออยู่ใน SAVEPOINT ของตัวเอง คำขอที่ผิดพลาดจะถูกย้อนกลับเฉพาะคำขอนั้น
+# ผู้อ่านยังใช้ connection ของตัวเองจาก pool ตามเดิม (WAL อ่านได้พร้อมกับที่ writer เขียน)
+
+WRITE_QUEUE_ENABLED = True
+WRITE_BATCH_SIZE = 64   # คำขอสูงสุดต่อหนึ่ง transaction
+WRITE_TIMEOUT = 60      # วินาทีที่ผู้เรียกรอผลจาก writer
+WRITE_LATENCY_SAMPLES = 1000
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _should_queue_write():
+    """ส่งเข้าคิวเมื่อเปิดใช้, ไม่ได้อยู่บน writer thread และไม่ได้อยู่ใน transaction() ของ thread นี้"""
+    if not WRITE_QUEUE_ENABLED or getattr(_query_context, 'writer', False):
+        return False
+    return not any(_transaction_depths().values())
+
+
+class _WriteRequest:
+    __slots__ = ('func', 'args', 'kwargs', 'future', 'enqueued', 'page', 'render', 'call_site')
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+        self.page = getattr(_query_context, 'page', None)
+        self.render = getattr(_query_context, 'render', 0)
+        self.call_site = _call_site()
+
+
+class WriteCoordinator:
+    """writer thread เดียวของไฟล์ฐานข้อมูลหนึ่งไฟล์
+
+    submit() คืนค่า Future ทันที, run() รอผล (หรือ exception ของคำขอนั้น) แล้วคืนค่า
+    ผลของคำขอจะถูกส่งกลับหลัง commit ของทั้งชุดสำเร็จแล้วเท่านั้น
+    ถ้ารอเกิน WRITE_TIMEOUT run() ยกเลิกคำขอที่ยังอยู่ในคิว (writer จะข้ามไป ไม่ถูกเขียนภายหลัง)
+    แต่คำขอที่ writer เริ่มรันแล้วยกเลิกไม่ได้และอาจยัง commit สำเร็จหลัง TimeoutError
+    """
+
+    def __init__(self, path, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._latencies = deque(maxlen=WRITE_LATENCY_SAMPLES)
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_batch': 0,
+            'max_depth': 0,
+            'queue_wait_time': 0.0,
+            'max_queue_wait': 0.0,
+            'batch_time': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="item-wiki-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        request = _WriteRequest(func, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise sqlite3.OperationalError("write queue is closed")
+            self._queue.put(request)
+            self._stats['submitted'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], self._queue.qsize())
+        return request.future
+
+    def run(self, func, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            return func(*args, **kwargs)
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise TimeoutError(f"write timed out after {WRITE_TIMEOUT}s in queue (cancelled, not written)")
+            raise TimeoutError(f"write timed out after {WRITE_TIMEOUT}s while running (may still commit)")
+
+    def close(self, timeout=None):
+        """รับคำขอใหม่ไม่ได้อีก งานที่อยู่ในคิวแล้วจะถูกเขียนจนหมดก่อน thread หยุด"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        _query_context.writer = True
+        with use_db_path(self.path):
+            stopping = False
+            while not stopping:
+                request = self._queue.get()
+                if request is None:
+                    break
+                batch = [request]
+                while len(batch) < self.batch_size:
+                    try:
+                        request = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if request is None:
+                        stopping = True
+                        break
+                    batch.append(request)
+                self._process(batch)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            with transaction():
+                for request in batch:
+                    if not request.future.set_running_or_notify_cancel():
+                        continue
+                    _query_context.page = request.page
+                    _query_context.render = request.render
+                    _query_context.call_site = request.call_site
+                    try:
+                        with transaction():
+                            outcomes.append((request, request.func(*request.args, **request.kwargs), None))
+                    except Exception as e:
+                        outcomes.append((request, None, e))
+                    finally:
+                        _query_context.call_site = None
+        except Exception as e:
+            # commit ไม่สำเร็จ: ทุกคำขอในชุดถือว่าล้มเหลว
+            reached = {id(request) for request, _, _ in outcomes}
+            outcomes = [(request, None, error or e) for request, _, error in outcomes]
+            outcomes += [(request, None, e) for request in batch
+                         if id(request) not in reached and not request.future.cancelled()]
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+            self._stats['batch_time'] += finished - started
+            for request, _, error in outcomes:
+                wait = started - request.enqueued
+                self._stats['queue_wait_time'] += wait
+                self._stats['max_queue_wait'] = max(self._stats['max_queue_wait'], wait)
+                self._stats['failed' if error else 'completed'] += 1
+                self._latencies.append(finished - request.enqueued)
+        for request, result, error in outcomes:
+            if error is None:
+                request.future.set_result(result)
+            else:
+                request.future.set_exception(error)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        stats['depth'] = self._queue.qsize()
+        done = stats['completed'] + stats['failed']
+        stats['avg_batch'] = done / stats['batches'] if stats['batches'] else 0.0
+        stats['avg_queue_wait'] = stats['queue_wait_time'] / done if done else 0.0
+        stats['latency_p50'] = latencies[len(latencies) // 2] if latencies else 0.0
+        stats['latency_p95'] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        stats['latency_max'] = latencies[-1] if latencies else 0.0
+        return stats
+
+
+def get_writer(path=None):
+    """writer ของไฟล์ฐานข้อมูล (สร้างและเริ่ม thread ครั้งแรกที่เรียกใช้)"""
+    path = path or get_db_path()
+    _last_used[path] = time.monotonic()
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = WriteCoordinator(path)
+                _writers[path] = writer
+    return writer
+
+
+def submit_write(func, *args, **kwargs):
+    """ส่งงานเขียน (ฟังก์ชันที่เรียก execute_query/transaction ข้างใน) เข้าคิว คืนค่า Future
+
+    ทั้งฟังก์ชันรันใน SAVEPOINT เดียวบน writer thread จึงเป็น atomic
+    """
+    return get_writer().submit(func, *args, **kwargs)
+
+
+def get_write_queue_stats(path=None):
+    """ความยาวคิว, ขนาดชุด, เวลารอในคิว และ latency (วินาที) ของ writer"""
+    return get_writer(path).stats()
+
+
+def close_all_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
 
 
 def check_duplicate_name(name, exclude_id=None):
-    """ตรวจสอบชื่อไอเท็มซ้ำ"""
-    if exclude_id:
-        query = "SELECT COUNT(*) as count FROM items WHERE LOWER(name) = LOWER(?) AND id != ?"
-        result = execute_query(query, (name.strip(), exclude_id), fetch_one=True)
-    else:
-        query = "SELECT COUNT(*) as count FROM items WHERE LOWER(name) = LOWER(?)"
-        result = execute_query(query, (name.strip(),), fetch_one=True)
-    return result['count'] > 0 if result else False
+    """ตรวจสอบชื่อไอเท็มซ้ำ (ค้นผ่าน unique index ของ name_key)"""
+    query = "SELECT id FROM items WHERE name_key = ? LIMIT 1"
+    result = execute_query(query, (normalize_name(name),), fetch_one=True)
+    if not result:
+        return False
+    return result['id'] != exclude_id
+
+
+def is_duplicate_name_error(error):
+    """ตรวจว่า IntegrityError เกิดจากชื่อไอเท็มซ้ำหรือไม่"""
+    return isinstance(error, sqlite3.IntegrityError) and 'items.name_key' in str(error)
+
+
+# ===== ค้นหาแบบ Full-text (FTS5) =====
+
+FTS_MIN_TERM_LENGTH = 3  # trigram tokenizer ค้นได้เมื่อคำค้นยาวอย่างน้อย 3 ตัวอักษร
+FTS_NAME_WEIGHT = 10.0   # น้ำหนัก bm25 ของชื่อเทียบกับคำอธิบาย
+
+
+def _split_terms(text):
+    """แยกคำค้นเป็น (คำที่ค้นผ่าน trigram ได้, คำที่สั้นกว่า FTS_MIN_TERM_LENGTH)"""
+    terms = (text or '').split()
+    return ([term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH],
+            [term for term in terms if len(term) < FTS_MIN_TERM_LENGTH])
+
+
+def fts_match_expression(text, column=None):
+    """แปลงคำค้นเป็น FTS5 MATCH expression (คืน None ถ้าไม่มีคำที่ยาวพอสำหรับ trigram)
+
+    แต่ละคำถูกค้นแบบ substring ผ่าน trigram และต้องพบครบทุกคำ
+    คำที่สั้นกว่า 3 ตัวอักษรไม่อยู่ใน expression — ใช้ short_terms_condition() ร่วมด้วย
+    ระบุ column เพื่อจำกัดการค้นไว้ที่คอลัมน์เดียว (เช่น 'name')
+    """
+    terms, _ = _split_terms(text)
+    if not terms:
+        return None
+    expression = ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+    if column:
+        return f"{column} : ({expression})"
+    return expression
+
+
+def short_terms_condition(text, names_only=False):
+    """เงื่อนไข LIKE ของคำที่สั้นเกินกว่า trigram จะค้นได้ (หนึ่งเงื่อนไขต่อคำ และต้องพบครบทุกคำ)
+
+    คืนค่า (condition, params) หรือ (None, ()) ถ้าไม่มีคำสั้น
+    """
+    _, terms = _split_terms(text)
+    conditions, params = [], []
+    for term in terms:
+        pattern = f"%{term}%"
+        if names_only:
+            conditions.append("name LIKE ?")
+            params.append(pattern)
+        else:
+            conditions.append("(name LIKE ? OR description LIKE ?)")
+            params.extend((pattern, pattern))
+    if not conditions:
+        return None, ()
+    return ' AND '.join(conditions), tuple(params)
+
+
+def search_condition(text, names_only=False):
+    """เงื่อนไขกรองตามคำค้นโดยไม่จัดอันดับ (ใช้กับ query ที่เรียงตามชื่อหรือการนับ)
+
+    คำที่ยาวพอค้นผ่าน FTS คำสั้นใช้ LIKE ทีละคำ ทุกคำต้องพบ คืนค่า (condition, params)
+    """
+    conditions, params = [], ()
+    match = fts_match_expression(text, 'name' if names_only else None)
+    if match is not None:
+        conditions.append("id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+        params += (match,)
+    short, short_params = short_terms_condition(text, names_only)
+    if short is not None:
+        conditions.append(short)
+        params += short_params
+    return ' AND '.join(conditions) or "1=1", params
+
+
+def _search_source(text, names_only=False):
+    """FROM/WHERE ของการค้นหาแบบจัดอันดับ พร้อมคอลัมน์ที่ใช้เรียงลำดับ
+
+    คืนค่า (from_sql, where_sql, params, sort_columns, key_names)
+    """
+    match = fts_match_expression(text, 'name' if names_only else None)
+    if match is None:
+        where, params = search_condition(text, names_only)
+        return "items", where, params, ('name', 'id'), ('name', 'id')
+
+    source = f"""
+        items JOIN (
+            SELECT rowid, bm25(items_fts, {FTS_NAME_WEIGHT}, 1.0) AS score
+            FROM items_fts WHERE items_fts MATCH ?
+        ) AS fts ON fts.rowid = items.id
+    """
+    # คำสั้นกรองเพิ่มบนแถวที่ FTS พบแล้ว (อันดับยังมาจากคำที่ยาวพอ)
+    short, short_params = short_terms_condition(text, names_only)
+    return source, short or "1=1", (match, *short_params), ('fts.score', 'items.id'), ('score', 'id')
+
+
+def search_items(text, conditions=(), params=(), limit=-1, names_only=False):
+    """ค้นหาไอเท็มจากชื่อและคำอธิบาย เรียงตามความเกี่ยวข้อง (bm25)
+
+    conditions คือเงื่อนไขเพิ่มเติมบนตาราง items (เช่น "rarity IN (?, ?)") พร้อม params
+    names_only=True ค้นเฉพาะ substring ในชื่อไอเท็ม (ไทย/อังกฤษปนกันได้)
+    คำที่สั้นกว่า 3 ตัวอักษรกรองด้วย LIKE ถ้าทุกคำสั้นจะเรียงตามชื่อแทน
+    """
+    source, where, search_params, sort_columns, _ = _search_source(text, names_only)
+    where += ''.join(f" AND ({condition})" for condition in conditions)
+    query = f"""
+        SELECT items.* FROM {source}
+        WHERE {where}
+        ORDER BY {', '.join(sort_columns)}
+        LIMIT ?
+    """
+    return execute_query(query, (*search_params, *params, limit))
+
+
+# ===== แบ่งหน้าแบบ Keyset =====
+# เลื่อนหน้าด้วย "แถวสุดท้ายที่เห็น" แทน OFFSET ทำให้ทุกหน้าใช้เวลาเท่ากันไม่ว่าจะอยู่หน้าไหน
+
+PAGE_SIZE = 24
+
+# แถวระบบ (ชื่อขึ้นต้นด้วย [ ) ไม่แสดงในหน้าเว็บ — is_system เป็นคอลัมน์ generated จาก migration 6
+# ทุก query ที่ซ่อนแถวระบบต้องใช้เงื่อนไขนี้ตรงตัว partial index ของหน้าเว็บจึงจะถูกเลือกใช้
+VISIBLE_CONDITION = "is_system = 0"
+SYSTEM_CONDITION = "is_system = 1"
+
+
+def _fetch_keyset_page(select_sql, where, params, sort_columns, key_names,
+                       cursor, page_size, backward):
+    if cursor is not None:
+        op = '<' if backward else '>'
+        placeholders = ', '.join(['?'] * len(cursor))
+        where += f" AND ({', '.join(sort_columns)}) {op} ({placeholders})"
+        params = (*params, *cursor)
+    direction = 'DESC' if backward else 'ASC'
+    order = ', '.join(f"{column} {direction}" for column in sort_columns)
+    query = f"{select_sql} WHERE {where} ORDER BY {order} LIMIT ?"
+
+    rows = execute_query(query, (*params, page_size + 1))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+    if not rows:
+        return Page(rows=[])
+
+    first = tuple(rows[0][key] for key in key_names)
+    last = tuple(rows[-1][key] for key in key_names)
+    if backward:
+        return Page(rows=rows, prev_cursor=first if has_more else None, next_cursor=last)
+    return Page(rows=rows, prev_cursor=first if cursor is not None else None,
+                next_cursor=last if has_more else None)
+
+
+def list_items_page(conditions=(), params=(), cursor=None, page_size=PAGE_SIZE, backward=False):
+    """ดึงไอเท็มทีละหน้าเรียงตาม (name, id)
+
+    cursor คือ (name, id) จาก Page.next_cursor / Page.prev_cursor ของหน้าก่อน
+    backward=True ดึงหน้าที่อยู่ก่อน cursor
+    """
+    where = ' AND '.join(f"({condition})" for condition in conditions) or "1=1"
+    return _fetch_keyset_page("SELECT * FROM items", where, tuple(params), ('name', 'id'), ('name', 'id'),
+                              cursor, page_size, backward)
+
+
+def search_items_page(text, conditions=(), params=(), cursor=None, page_size=PAGE_SIZE,
+                      backward=False, names_only=False):
+    """ผลการค้นหาทีละหน้า เรียงตามความเกี่ยวข้อง (cursor เป็น (score, id))"""
+    source, where, search_params, sort_columns, key_names = _search_source(text, names_only)
+    where += ''.join(f" AND ({condition})" for condition in conditions)
+    select_sql = f"SELECT items.*{', fts.score AS score' if key_names[0] == 'score' else ''} FROM {source}"
+    return _fetch_keyset_page(select_sql, where, (*search_params, *params), sort_columns, key_names,
+                              cursor, page_size, backward)
+
+
+def count_items(conditions=(), params=(), search_text=None, names_only=False):
+    """นับจำนวนไอเท็มที่ตรงเงื่อนไข (และคำค้น ถ้ามี)"""
+    conditions, params = list(conditions), tuple(params)
+    if search_text and search_text.strip():
+        condition, search_params = search_condition(search_text, names_only)
+        conditions.append(condition)
+        params += search_params
+    where = ' AND '.join(f"({condition})" for condition in conditions) or "1=1"
+    result = execute_query(f"SELECT COUNT(*) as count FROM items WHERE {where}", params, fetch_one=True)
+    return result['count'] if result else 0
+
+
+# ===== ลบไอเท็มทีละชุด =====
+# การลบจำนวนมากใน transaction เดียวถือ write lock ตลอดเวลาที่ trigger (FTS, item_stats, revision)
+# ทำงานกับทุกแถว จึงแบ่งลบเป็นชุดละ DELETE_CHUNK_SIZE แถว แต่ละชุดเป็นคำขอเขียนแยกกัน
+# และพัก DELETE_CHUNK_PAUSE วินาทีระหว่างชุด ให้คำขอเขียนอื่นในคิวและ checkpoint ได้ทำงาน
+# ถ้าเรียกภายใน transaction() ทุกชุดอยู่ใน transaction นั้น (lock ไม่ถูกปล่อยจนกว่าจะจบ)
+
+DELETE_CHUNK_SIZE = 2000
+DELETE_CHUNK_PAUSE = 0.01
+
+
+def _delete_chunk(where, params, after_id, chunk_size):
+    """ลบแถวที่ตรงเงื่อนไขและมี id > after_id ไม่เกิน chunk_size แถว คืนค่า id ที่ลบ"""
+    if _should_queue_write():
+        return get_writer().run(_delete_chunk, where, params, after_id, chunk_size)
+    query = f'''
+        DELETE FROM items WHERE id IN (
+            SELECT id FROM items WHERE id > ? AND ({where}) ORDER BY id LIMIT ?
+        ) RETURNING id
+    '''
+    with transaction() as conn:
+        started = time.perf_counter()
+        chunk_params = (after_id, *params, chunk_size)
+        ids = [row[0] for row in conn.execute(query, chunk_params)]
+        _record_query(conn, query, chunk_params, (time.perf_counter() - started) * 1000, len(ids))
+    return ids
+
+
+def _iter_delete(where, params, total, chunk_size, pause):
+    progress = DeleteProgress(deleted=0, total=total)
+    after_id = 0
+    while True:
+        ids = _delete_chunk(where, params, after_id, chunk_size)
+        if not ids:
+            break
+        after_id = max(ids)
+        progress.deleted += len(ids)
+        progress.chunks += 1
+        yield progress
+        if pause:
+            time.sleep(pause)
+
+
+def _iter_delete_ids(item_ids, where, params, chunk_size, pause):
+    """ลบตามรายการ id ที่เรียงแล้ว ทีละ chunk_size (where ตรวจซ้ำตอนลบ ต้องเป็นเงื่อนไขต่อแถวที่ถูก)"""
+    progress = DeleteProgress(deleted=0, total=len(item_ids))
+    for start in range(0, len(item_ids), chunk_size):
+        if start and pause:
+            time.sleep(pause)
+        chunk = item_ids[start:start + chunk_size]
+        # แต่ละชุดใช้ json_each ตัวแปรเดียว ไม่ติดขีดจำกัดจำนวนตัวแปรของ SQLite
+        ids = _delete_chunk(f"id IN (SELECT value FROM json_each(?)) AND ({where})",
+                            (json.dumps(chunk), *params), chunk[0] - 1, chunk_size)
+        progress.deleted += len(ids)
+        progress.chunks += 1
+        yield progress
+
+
+def iter_delete_items(item_ids, chunk_size=None, pause=None):
+    """ลบไอเท็มตาม id ทีละชุด yield DeleteProgress หลังแต่ละชุด (id ที่ไม่มีอยู่ถูกข้าม)"""
+    yield from _iter_delete_ids(sorted(set(item_ids)), "1=1", (), chunk_size or DELETE_CHUNK_SIZE,
+                                DELETE_CHUNK_PAUSE if pause is None else pause)
+
+
+def iter_delete_items_where(conditions=(), params=(), search_text=None, names_only=False,
+                            chunk_size=None, pause=None):
+    """ลบไอเท็มที่ตรงเงื่อนไข (แบบเดียวกับ count_items) ทีละชุดตามลำดับ id yield DeleteProgress
+
+    total ของ progress นับไว้ก่อนเริ่มลบ ไอเท็มที่ถูกเพิ่มระหว่างลบและตรงเงื่อนไขก็ถูกลบด้วย
+    ยกเว้นเมื่อมีคำค้น: id ที่ตรงคำค้นถูกหาครั้งเดียวก่อนเริ่ม (subquery ของ FTS ถูกประเมินใหม่ทั้งหมด
+    ทุกชุด ทำให้เวลารวมโตแบบกำลังสอง) แล้วลบตาม id นั้น โดยตรวจเงื่อนไขอื่นซ้ำตอนลบ
+    """
+    chunk_size = chunk_size or DELETE_CHUNK_SIZE
+    pause = DELETE_CHUNK_PAUSE if pause is None else pause
+    conditions, params = list(conditions), tuple(params)
+    where = ' AND '.join(f"({condition})" for condition in conditions) or "1=1"
+    if search_text and search_text.strip():
+        condition, search_params = search_condition(search_text, names_only)
+        with read_snapshot(False):
+            item_ids = [row['id'] for row in iter_query(
+                f"SELECT id FROM items WHERE {where} AND ({condition}) ORDER BY id", (*params, *search_params))]
+        yield from _iter_delete_ids(item_ids, where, params, chunk_size, pause)
+        return
+    total = execute_query(f"SELECT COUNT(*) as count FROM items WHERE {where}", params, fetch_one=True)['count']
+    yield from _iter_delete(where, params, total, chunk_size, pause)
+
+
+# ===== สถิติไอเท็ม (ตาราง item_stats ที่ trigger ดูแล) =====
+
+def get_item_stats():
+    """สถิติไอเท็มทั้งหมดใน query เดียว (ไม่รวมแถวระบบ)
+
+    คืนค่า {'total': n, 'type': {...}, 'rarity': {...}, 'location': {...}, 'tier': {...}}
+    """
+    stats = {'total': 0, 'type': {}, 'rarity': {}, 'location': {}, 'tier': {}}
+    for row in execute_query("SELECT dimension, value, count FROM item_stats WHERE count > 0"):
+        if row['dimension'] == 'total':
+            stats['total'] = row['count']
+        else:
+            stats.setdefault(row['dimension'], {})[row['value']] = row['count']
+    return stats
 
 
 # ===== ฟังก์ชันสำหรับจัดการ Master Data =====
+# ทุกครั้งที่ master data เปลี่ยน (จาก process ใดก็ได้) revision 'master_data' จะเพิ่มขึ้นด้วย trigger
+# เพื่อให้ cache ใน utils.py รู้ว่าต้องโหลดใหม่
+
+# หมวดหมู่ master data → คอลัมน์ในตาราง items
+MASTER_DATA_COLUMNS = {
+    'type': 'type',
+    'rarity': 'rarity',
+    'location': 'drop_location',
+    'tier': 'tier',
+}
+
+def get_master_data_version():
+    """เวอร์ชันปัจจุบันของ master data (เพิ่มขึ้นทุกครั้งที่มีการแก้ไข ไม่ว่าจาก process ใด)
+
+    ระหว่าง render หนึ่งครั้ง (start_page_render) อ่านจากไฟล์ครั้งเดียวแล้วจำไว้ — utils เรียกทุกครั้ง
+    ที่ดึงค่าของหมวดหมู่ใดๆ ฟังก์ชันแก้ไข master data ด้านล่างล้างค่าที่จำไว้ของ thread ที่แก้
+    """
+    render = getattr(_query_context, 'render', 0)
+    if not render or getattr(_query_context, 'writer', False):
+        return get_catalog_revision('master_data')
+    key = (render, get_db_path())
+    cached = getattr(_query_context, 'master_data_version', None)
+    if cached is None or cached[0] != key:
+        cached = (key, get_catalog_revision('master_data'))
+        _query_context.master_data_version = cached
+    return cached[1]
+
+
+def _forget_master_data_version():
+    _query_context.master_data_version = None
+
 
 def get_master_data(category):
-    """ดึงข้อมูล master data ตามหมวดหมู่"""
+    """ดึงข้อมูล master data ตามหมวดหมู่
+
+    อ่านจากไฟล์จริงเสมอ (ไม่ใช่ snapshot) ให้ตรงกับ get_master_data_version() ที่อ่านจากไฟล์
+    ไม่เช่นนั้น cache ใน utils.py จะเก็บแถวเก่าของ snapshot ไว้ภายใต้เวอร์ชันใหม่
+    """
     query = """
         SELECT * FROM master_data 
         WHERE category = ? 
         ORDER BY sort_order, value
     """
-    return execute_query(query, (category,))
+    with read_snapshot(False):
+        return execute_query(query, (category,))
 
 
 def add_master_data(category, value, color=None):
@@ -144,34 +1526,54 @@ def add_master_data(category, value, color=None):
             INSERT INTO master_data (category, value, color, sort_order)
             VALUES (?, ?, ?, ?)
         '''
-        return execute_query(query, (category, value.strip(), color, next_order))
+        new_id = execute_query(query, (category, value.strip(), color, next_order))
+        _forget_master_data_version()
+        return new_id
     except Exception as e:
         print(f"Error adding master data: {e}")
         return None
 
 
+def get_facet_counts(category, values=None, include_system=False):
+    """จำนวนไอเท็มที่ใช้แต่ละค่าของหมวดหมู่ ด้วย GROUP BY ครั้งเดียว คืนค่า {ค่า: จำนวน}
+
+    ระบุ values เพื่อนับเฉพาะบางค่า (ค้นผ่าน index แทนการไล่ทั้งตาราง)
+    include_system=True นับแถวระบบด้วย (แยกเป็น query ที่สองเพื่อให้ทั้งสองส่วนใช้ partial index)
+    """
+    column = MASTER_DATA_COLUMNS.get(category)
+    if column is None:
+        return {}
+    value_condition, params = "", ()
+    if values is not None:
+        value_condition = f" AND {column} IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(values), ensure_ascii=False),)
+
+    counts = {}
+    for condition in (VISIBLE_CONDITION, SYSTEM_CONDITION) if include_system else (VISIBLE_CONDITION,):
+        rows = execute_query(f"""
+            SELECT {column} AS value, COUNT(*) AS count FROM items
+            WHERE {condition}{value_condition}
+            GROUP BY {column}
+        """, params)
+        for row in rows:
+            counts[row['value']] = counts.get(row['value'], 0) + row['count']
+    return counts
+
+
 def delete_master_data(category, value):
     """ลบข้อมูล master data"""
     try:
-        # ตรวจสอบว่ามีไอเท็มที่ใช้ข้อมูลนี้หรือไม่
-        if category == 'type':
-            check_query = "SELECT COUNT(*) as count FROM items WHERE type = ?"
-        elif category == 'rarity':
-            check_query = "SELECT COUNT(*) as count FROM items WHERE rarity = ?"
-        elif category == 'location':
-            check_query = "SELECT COUNT(*) as count FROM items WHERE drop_location = ?"
-        elif category == 'tier':
-            check_query = "SELECT COUNT(*) as count FROM items WHERE tier = ?"
-        else:
+        if category not in MASTER_DATA_COLUMNS:
             return False
 
-        result = execute_query(check_query, (value,), fetch_one=True)
-        if result and result['count'] > 0:
+        # ตรวจสอบว่ามีไอเท็มที่ใช้ข้อมูลนี้หรือไม่
+        if get_facet_counts(category, [value], include_system=True).get(value, 0) > 0:
             return False  # มีไอเท็มใช้งานอยู่
 
         # ลบข้อมูล
         query = "DELETE FROM master_data WHERE category = ? AND value = ?"
         execute_query(query, (category, value))
+        _forget_master_data_version()
         return True
     except Exception as e:
         print(f"Error deleting master data: {e}")
@@ -183,6 +1585,7 @@ def update_master_data_color(category, value, color):
     try:
         query = "UPDATE master_data SET color = ? WHERE category = ? AND value = ?"
         execute_query(query, (color, category, value))
+        _forget_master_data_version()
         return True
     except Exception as e:
         print(f"Error updating color: {e}")
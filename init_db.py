@@ -1,5 +1,5 @@
 import os
-from database import init_database, execute_query
+from database import init_database, execute_query, execute_many
 from PIL import Image, ImageDraw
 
 
@@ -108,20 +108,19 @@ def init_sample_data():
             }
         ]
 
-        for item_data in sample_items:
-            query = '''
-                INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            '''
-            execute_query(query, (
-                item_data['name'],
-                item_data['type'],
-                item_data['rarity'],
-                item_data['drop_location'],
-                item_data['tier'],
-                item_data['description'],
-                item_data['image_path']
-            ))
+        query = '''
+            INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        execute_many(query, [(
+            item_data['name'],
+            item_data['type'],
+            item_data['rarity'],
+            item_data['drop_location'],
+            item_data['tier'],
+            item_data['description'],
+            item_data['image_path']
+        ) for item_data in sample_items])
         print("✅ เพิ่มข้อมูลตัวอย่าง 10 รายการเรียบร้อย!")
 
 
@@ -0,0 +1,317 @@
+"""บำรุงรักษาฐานข้อมูลตามรอบ: PRAGMA optimize, ANALYZE, incremental vacuum และตรวจความถูกต้อง
+
+งานแต่ละอย่างรันเมื่อ "ถึงเวลา" เท่านั้น:
+- optimize          ทุกครั้งที่มีการเขียนตั้งแต่รอบก่อน (ถูก: SQLite เลือกเองว่าต้อง ANALYZE ตารางไหน)
+- analyze           เมื่อมีการเขียนแคตตาล็อกเกิน ANALYZE_WRITE_THRESHOLD แถวนับจาก ANALYZE ครั้งก่อน
+- incremental_vacuum เมื่อหน้าว่าง (freelist) เกิน VACUUM_FREE_RATIO ของไฟล์
+- integrity_check   PRAGMA quick_check ทุก INTEGRITY_CHECK_INTERVAL วินาที
+
+ปริมาณการเขียนนับจาก catalog revision (database.get_catalog_revision) ที่ trigger เพิ่มทุกแถวที่เปลี่ยน
+ผลทุกครั้งถูกบันทึกในตาราง maintenance_log (migration 8) จึงใช้ร่วมกันได้หลาย process
+
+MaintenanceScheduler ตรวจทุก CHECK_INTERVAL วินาที และรันเมื่อไม่มีการเขียนมาแล้ว IDLE_SECONDS วินาที
+หรือเมื่อการเขียนสะสมเกิน ANALYZE_WRITE_THRESHOLD (ไม่รอช่วงว่าง) งานที่เขียนฐานข้อมูลแบ่งเป็น
+transaction สั้น ๆ (optimize/ANALYZE ผ่านคิวของ writer, vacuum ทีละ VACUUM_PAGES_PER_STEP หน้า)
+ผู้แก้ไขคนอื่นจึงรอไม่นาน
+
+รัน:  python maintenance.py            (งานที่ถึงเวลา)
+      python maintenance.py --force    (ทุกงาน)
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import database
+
+CHECK_INTERVAL = 30              # วินาทีระหว่างการตรวจของ scheduler
+IDLE_SECONDS = 60                # ถือว่าว่างเมื่อไม่มีการเขียนแคตตาล็อกนานเท่านี้
+ANALYZE_WRITE_THRESHOLD = 5000   # แถวที่เปลี่ยนก่อนต้อง ANALYZE ใหม่
+ANALYSIS_LIMIT = 1000            # PRAGMA analysis_limit: ANALYZE แบบสุ่มตัวอย่าง ไม่อ่านทั้ง index
+VACUUM_FREE_RATIO = 0.10         # สัดส่วนหน้าว่างที่ทำให้ต้อง incremental vacuum
+VACUUM_PAGES_PER_STEP = 1000     # หน้าที่คืนต่อหนึ่ง transaction
+VACUUM_STEP_PAUSE = 0.01
+INTEGRITY_CHECK_INTERVAL = 24 * 60 * 60
+
+TASKS = ('optimize', 'analyze', 'incremental_vacuum', 'integrity_check')
+
+logger = logging.getLogger("item_wiki.maintenance")
+
+
+@dataclass
+class MaintenanceResult:
+    """ผลของงานหนึ่งงาน (บันทึกลง maintenance_log ด้วย)"""
+    task: str
+    ok: bool
+    duration_ms: float
+    reclaimed_bytes: int = 0
+    detail: str = ""
+
+
+def _pragma(name):
+    with database.get_db_connection() as conn:
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def file_stats():
+    """ขนาดไฟล์และหน้าว่าง {'page_size', 'page_count', 'freelist_count', 'auto_vacuum', 'free_ratio'}"""
+    stats = {name: _pragma(name) for name in ('page_size', 'page_count', 'freelist_count', 'auto_vacuum')}
+    stats['free_ratio'] = stats['freelist_count'] / stats['page_count'] if stats['page_count'] else 0.0
+    return stats
+
+
+def _last_run(task):
+    return database.execute_query(
+        "SELECT *, CAST(strftime('%s', started_at) AS INTEGER) AS started_ts FROM maintenance_log "
+        "WHERE task = ? AND ok = 1 ORDER BY id DESC LIMIT 1", (task,), fetch_one=True)
+
+
+def _log(result, revision):
+    database.execute_query('''
+        INSERT INTO maintenance_log (task, duration_ms, reclaimed_bytes, revision, ok, detail)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (result.task, result.duration_ms, result.reclaimed_bytes, revision, int(result.ok), result.detail))
+
+
+# ===== งานแต่ละอย่าง =====
+# คืนค่า (reclaimed_bytes, detail)
+
+def _on_writer(func, *args):
+    """รัน func บน writer thread (ใน transaction ของ writer) เหมือนคำขอเขียนอื่น"""
+    return database.get_writer().run(func, *args)
+
+
+def _optimize():
+    def run():
+        with database.get_db_connection() as conn:
+            conn.execute("PRAGMA optimize")
+    _on_writer(run)
+    return 0, ""
+
+
+def _analyze():
+    def run():
+        with database.get_db_connection() as conn:
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+    _on_writer(run)
+    return 0, f"analysis_limit={ANALYSIS_LIMIT}"
+
+
+def _incremental_vacuum():
+    stats = file_stats()
+    if stats['auto_vacuum'] != 2:
+        return 0, "auto_vacuum ไม่ใช่ INCREMENTAL (ใช้ enable_incremental_vacuum ครั้งเดียวก่อน)"
+
+    # sqlite3 ของ Python step คำสั่งที่ไม่มีคอลัมน์ผลลัพธ์เพียงครั้งเดียว (= คืนแค่หน้าเดียว)
+    # executescript รันจนจบแต่ commit transaction ที่ค้างอยู่ก่อน จึงใช้ connection แยกแทน writer thread
+    # แต่ละขั้นเป็น transaction สั้น ๆ ของตัวเอง ผู้เขียนคนอื่นรอไม่เกินหนึ่งขั้น (busy timeout)
+    conn = database._open_connection(database.get_db_path())
+    try:
+        remaining = stats['freelist_count']
+        while remaining:
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP});")
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= remaining:
+                break
+            remaining = left
+            time.sleep(VACUUM_STEP_PAUSE)
+        after = conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    pages = stats['page_count'] - after
+    return pages * stats['page_size'], f"{pages:,} หน้า, เหลือ {after:,} หน้า"
+
+
+def _integrity_check():
+    # อ่านอย่างเดียว: ใช้ connection ของ pool (WAL ไม่บล็อกผู้เขียน)
+    with database.get_db_connection() as conn:
+        rows = [row[0] for row in conn.execute("PRAGMA quick_check").fetchall()]
+    if rows == ['ok']:
+        return 0, "ok"
+    raise sqlite3.DatabaseError("; ".join(rows[:10]))
+
+
+_TASK_FUNCTIONS = {
+    'optimize': _optimize,
+    'analyze': _analyze,
+    'incremental_vacuum': _incremental_vacuum,
+    'integrity_check': _integrity_check,
+}
+
+
+def run_task(task):
+    """รันงานเดียวทันทีและบันทึกผล คืนค่า MaintenanceResult (ข้อผิดพลาดถูกบันทึก ไม่ถูกโยนต่อ)"""
+    revision = database.get_catalog_revision()
+    started = time.perf_counter()
+    try:
+        reclaimed, detail = _TASK_FUNCTIONS[task]()
+        ok = True
+    except (sqlite3.Error, TimeoutError) as e:
+        # TimeoutError: งานที่ส่งผ่าน writer (optimize/analyze) รอคิวเขียนนานเกิน WRITE_TIMEOUT
+        reclaimed, detail, ok = 0, f"{type(e).__name__}: {e}", False
+    result = MaintenanceResult(task=task, ok=ok, duration_ms=(time.perf_counter() - started) * 1000,
+                               reclaimed_bytes=reclaimed, detail=detail)
+    try:
+        _log(result, revision)
+    except (sqlite3.Error, TimeoutError):
+        # คิวเขียนยังติดอยู่: ผลยังคืนให้ผู้เรียก แต่ไม่มีแถวใน maintenance_log (งานจะถูกพิจารณาใหม่รอบหน้า)
+        logger.exception("could not record maintenance result %s", result)
+    return result
+
+
+def due_tasks(now=None):
+    """งานที่ถึงเวลารัน ตามปริมาณการเขียน หน้าว่าง และเวลาตั้งแต่ครั้งก่อน"""
+    now = now or time.time()
+    revision = database.get_catalog_revision()
+    due = []
+    for task in ('optimize', 'analyze'):
+        last = _last_run(task)
+        threshold = 1 if task == 'optimize' else ANALYZE_WRITE_THRESHOLD
+        if last is None or revision - (last['revision'] or 0) >= threshold:
+            due.append(task)
+    stats = file_stats()
+    if stats['auto_vacuum'] == 2 and stats['free_ratio'] >= VACUUM_FREE_RATIO:
+        due.append('incremental_vacuum')
+    last = _last_run('integrity_check')
+    if last is None or now - last['started_ts'] >= INTEGRITY_CHECK_INTERVAL:
+        due.append('integrity_check')
+    return due
+
+
+def run_maintenance(tasks=None, force=False):
+    """รันงานที่ถึงเวลา (หรือทุกงานใน tasks เมื่อ force) คืนค่ารายการ MaintenanceResult"""
+    tasks = tasks or TASKS
+    selected = tasks if force else [task for task in due_tasks() if task in tasks]
+    # ANALYZE ครอบคลุมสิ่งที่ optimize จะทำอยู่แล้ว
+    if 'analyze' in selected and 'optimize' in selected and not force:
+        selected = [task for task in selected if task != 'optimize']
+    return [run_task(task) for task in selected]
+
+
+def enable_incremental_vacuum():
+    """เปลี่ยนไฟล์เดิมเป็น auto_vacuum = INCREMENTAL (ต้อง VACUUM ทั้งไฟล์หนึ่งครั้ง บล็อกผู้เขียนระหว่างนั้น)"""
+    if file_stats()['auto_vacuum'] == 2:
+        return False
+    started = time.perf_counter()
+    before = _pragma('page_count') * _pragma('page_size')
+    conn = database._open_connection(database.get_db_path())
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    after = _pragma('page_count') * _pragma('page_size')
+    _log(MaintenanceResult(task='vacuum', ok=True, duration_ms=(time.perf_counter() - started) * 1000,
+                           reclaimed_bytes=before - after, detail="auto_vacuum = INCREMENTAL"),
+         database.get_catalog_revision())
+    return True
+
+
+def get_maintenance_log(limit=50):
+    return database.execute_query("SELECT * FROM maintenance_log ORDER BY id DESC LIMIT ?", (limit,))
+
+
+def get_last_results():
+    """ผลล่าสุดของแต่ละงาน {งาน: แถวของ maintenance_log} (รวมครั้งที่ผิดพลาด)"""
+    rows = database.execute_query('''
+        SELECT * FROM maintenance_log WHERE id IN (SELECT MAX(id) FROM maintenance_log GROUP BY task)
+    ''')
+    return {row['task']: row for row in rows}
+
+
+# ===== Scheduler =====
+
+class MaintenanceScheduler:
+    """thread เบื้องหลังหนึ่งตัวต่อไฟล์ฐานข้อมูล รันงานที่ถึงเวลาเมื่อว่างหรือเมื่อการเขียนสะสมมาก
+
+    ข้ามการตรวจขณะไฟล์ถูกปิด (เช่นถูก database.MAX_OPEN_DATABASES ไล่ออก) เพราะการตรวจต้องเปิดไฟล์
+    ซึ่งจะไล่แคตตาล็อกอื่นที่กำลังถูกใช้ออกแทน ไฟล์ที่ไม่มีใครเปิดก็ไม่มีการเขียนให้ต้องบำรุงรักษา
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stop = threading.Event()
+        self._revision = None
+        self._changed_at = time.monotonic()
+        self.last_results = []
+        self._thread = threading.Thread(target=self._run, name="item-wiki-maintenance", daemon=True)
+        self._thread.start()
+
+    def _should_run(self):
+        revision = database.get_catalog_revision()
+        now = time.monotonic()
+        if revision != self._revision:
+            self._revision, self._changed_at = revision, now
+        idle = now - self._changed_at >= IDLE_SECONDS
+        last = _last_run('analyze')
+        busy_backlog = last is not None and revision - (last['revision'] or 0) >= ANALYZE_WRITE_THRESHOLD
+        return idle or busy_backlog
+
+    def _run(self):
+        with database.use_db_path(self.path):
+            while not self._stop.wait(CHECK_INTERVAL):
+                if self.path not in database.get_open_databases():
+                    continue
+                try:
+                    if self._should_run():
+                        results = run_maintenance()
+                        if results:
+                            self.last_results = results
+                except Exception:
+                    # thread ต้องทำงานต่อไม่ว่าจะผิดพลาดแบบใด (รวมถึงการบันทึก maintenance_log ไม่สำเร็จ)
+                    logger.exception("maintenance check failed for %s", self.path)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def start_maintenance_scheduler(path=None):
+    """เริ่ม scheduler ของไฟล์ฐานข้อมูล (เรียกซ้ำได้ แต่ละไฟล์มีเพียงตัวเดียวต่อ process)"""
+    path = path or database.get_db_path()
+    with _schedulers_lock:
+        scheduler = _schedulers.get(path)
+        if scheduler is None:
+            scheduler = _schedulers[path] = MaintenanceScheduler(path)
+    return scheduler
+
+
+def stop_all_schedulers(timeout=None):
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+        _schedulers.clear()
+    for scheduler in schedulers:
+        scheduler.stop(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="บำรุงรักษาฐานข้อมูล item wiki")
+    parser.add_argument('--db', help="ไฟล์ฐานข้อมูล (ค่าเริ่มต้น: database.DB_PATH)")
+    parser.add_argument('--task', nargs='+', choices=TASKS, help="รันเฉพาะงานเหล่านี้")
+    parser.add_argument('--force', action='store_true', help="รันแม้ยังไม่ถึงเวลา")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="เปลี่ยนไฟล์เดิมเป็น auto_vacuum = INCREMENTAL (VACUUM ทั้งไฟล์)")
+    args = parser.parse_args()
+
+    if args.db:
+        database.DB_PATH = args.db
+    database.init_database()
+    if args.enable_incremental_vacuum and enable_incremental_vacuum():
+        print("auto_vacuum = INCREMENTAL")
+    for result in run_maintenance(args.task, force=args.force):
+        status = "ok" if result.ok else "ERROR"
+        print(f"{result.task:<20} {status:<6} {result.duration_ms:>10.1f} ms  "
+              f"{result.reclaimed_bytes:>12,} B  {result.detail}")
+    database.close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Schema migrations ของฐานข้อมูล
+
+แต่ละ migration มีหมายเลขเวอร์ชันเรียงกัน และจะถูกรันเพียงครั้งเดียวต่อไฟล์ฐานข้อมูล
+เวอร์ชันที่รันแล้วจะถูกบันทึกในตาราง schema_version ทำให้ไฟล์ item_wiki.db เดิม
+อัปเกรดได้ในที่โดยไม่ต้องสร้างใหม่
+"""
+import sqlite3
+
+
+def _backfill_name_key(conn):
+    conn.execute("UPDATE items SET name_key = normalize_name(name)")
+    # ชื่อที่ซ้ำกันอยู่แล้วในข้อมูลเดิม: แถวแรกได้คีย์ปกติ แถวถัดไปต่อท้ายด้วย id
+    # เพื่อให้สร้าง unique index ได้โดยไม่ต้องแก้ชื่อของผู้ใช้
+    conn.execute("""
+        UPDATE items SET name_key = name_key || char(31) || id
+        WHERE id NOT IN (SELECT MIN(id) FROM items GROUP BY name_key)
+    """)
+
+
+def _rebuild_item_stats(conn):
+    """นับสถิติใหม่ทั้งหมดจากตาราง items (ใช้ตอนสร้างตารางครั้งแรก)"""
+    conn.execute("DELETE FROM item_stats")
+    conn.execute("""
+        INSERT INTO item_stats (dimension, value, count)
+        SELECT 'total', '', COUNT(*) FROM items WHERE name NOT LIKE '[%]%'
+    """)
+    for dimension, column in (('type', 'type'), ('rarity', 'rarity'),
+                              ('location', 'drop_location'), ('tier', 'tier')):
+        conn.execute(f"""
+            INSERT INTO item_stats (dimension, value, count)
+            SELECT '{dimension}', {column}, COUNT(*) FROM items
+            WHERE name NOT LIKE '[%]%' GROUP BY {column}
+        """)
+
+
+# ===== รายการ Migration =====
+# (เวอร์ชัน, คำอธิบาย, ขั้นตอน) — ขั้นตอนเป็น SQL string หรือฟังก์ชันที่รับ connection
+
+MIGRATIONS = [
+    (1, "indexes for item filters and name sort", [
+        "CREATE INDEX IF NOT EXISTS idx_items_name ON items (name)",
+        "CREATE INDEX IF NOT EXISTS idx_items_type_name ON items (type, name)",
+        "CREATE INDEX IF NOT EXISTS idx_items_rarity_name ON items (rarity, name)",
+        "CREATE INDEX IF NOT EXISTS idx_items_location_name ON items (drop_location, name)",
+        "CREATE INDEX IF NOT EXISTS idx_items_tier_name ON items (tier, name)",
+    ]),
+    (2, "index for ordered master data lookups", [
+        "CREATE INDEX IF NOT EXISTS idx_master_data_category_order "
+        "ON master_data (category, sort_order, value)",
+    ]),
+    # normalize_name() ถูก register ไว้ทุก connection ใน database._open_connection
+    (3, "normalized unique item name key", [
+        "ALTER TABLE items ADD COLUMN name_key TEXT",
+        _backfill_name_key,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_items_name_key ON items (name_key)",
+        """
+        CREATE TRIGGER IF NOT EXISTS items_name_key_ai AFTER INSERT ON items
+        BEGIN
+            UPDATE items SET name_key = normalize_name(NEW.name) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_name_key_au AFTER UPDATE OF name ON items
+        WHEN NEW.name IS NOT OLD.name
+        BEGIN
+            UPDATE items SET name_key = normalize_name(NEW.name) WHERE id = NEW.id;
+        END
+        """,
+    ]),
+    # trigram tokenizer: ภาษาไทยไม่มีช่องว่างระหว่างคำ จึงต้องค้นแบบ substring (ตั้งแต่ 3 ตัวอักษร)
+    (4, "FTS5 index over item name and description", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            name, description,
+            content='items', content_rowid='id',
+            tokenize='trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items
+        BEGIN
+            INSERT INTO items_fts (rowid, name, description)
+            VALUES (NEW.id, NEW.name, NEW.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items
+        BEGIN
+            INSERT INTO items_fts (items_fts, rowid, name, description)
+            VALUES ('delete', OLD.id, OLD.name, OLD.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, description ON items
+        BEGIN
+            INSERT INTO items_fts (items_fts, rowid, name, description)
+            VALUES ('delete', OLD.id, OLD.name, OLD.description);
+            INSERT INTO items_fts (rowid, name, description)
+            VALUES (NEW.id, NEW.name, NEW.description);
+        END
+        """,
+        "INSERT INTO items_fts (items_fts) VALUES ('rebuild')",
+    ]),
+    # นับเฉพาะไอเท็มที่แสดงในหน้าเว็บ (ไม่รวมแถวระบบที่ชื่อขึ้นต้นด้วย [ )
+    (5, "trigger-maintained item statistics", [
+        """
+        CREATE TABLE IF NOT EXISTS item_stats (
+            dimension TEXT NOT NULL,  -- 'total', 'type', 'rarity', 'location', 'tier'
+            value TEXT NOT NULL,      -- '' สำหรับ total
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_stats_ai AFTER INSERT ON items
+        WHEN NEW.name NOT LIKE '[%]%'
+        BEGIN
+            INSERT INTO item_stats (dimension, value, count)
+            VALUES ('total', '', 1), ('type', NEW.type, 1), ('rarity', NEW.rarity, 1),
+                   ('location', NEW.drop_location, 1), ('tier', NEW.tier, 1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_stats_ad AFTER DELETE ON items
+        WHEN OLD.name NOT LIKE '[%]%'
+        BEGIN
+            UPDATE item_stats SET count = count - 1
+            WHERE (dimension, value) IN (
+                VALUES ('total', ''), ('type', OLD.type), ('rarity', OLD.rarity),
+                       ('location', OLD.drop_location), ('tier', OLD.tier)
+            );
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_stats_au_old
+        AFTER UPDATE OF name, type, rarity, drop_location, tier ON items
+        WHEN OLD.name NOT LIKE '[%]%'
+        BEGIN
+            UPDATE item_stats SET count = count - 1
+            WHERE (dimension, value) IN (
+                VALUES ('total', ''), ('type', OLD.type), ('rarity', OLD.rarity),
+                       ('location', OLD.drop_location), ('tier', OLD.tier)
+            );
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_stats_au_new
+        AFTER UPDATE OF name, type, rarity, drop_location, tier ON items
+        WHEN NEW.name NOT LIKE '[%]%'
+        BEGIN
+            INSERT INTO item_stats (dimension, value, count)
+            VALUES ('total', '', 1), ('type', NEW.type, 1), ('rarity', NEW.rarity, 1),
+                   ('location', NEW.drop_location, 1), ('tier', NEW.tier, 1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+        END
+        """,
+        _rebuild_item_stats,
+    ]),
+    # คอลัมน์ generated แบบ VIRTUAL: ไม่ต้อง backfill หรือใช้ trigger และค่าถูกต้องเสมอเมื่อชื่อเปลี่ยน
+    # index ของหน้าเว็บเปลี่ยนเป็น partial index เฉพาะแถวที่แสดง (WHERE is_system = 0)
+    # query ต้องมีเงื่อนไข is_system = 0 ตรงตัว (database.VISIBLE_CONDITION) จึงจะใช้ index ได้
+    (6, "is_system flag with partial indexes over visible items", [
+        "ALTER TABLE items ADD COLUMN is_system INTEGER GENERATED ALWAYS AS (name LIKE '[%]%') VIRTUAL",
+        "DROP INDEX IF EXISTS idx_items_name",
+        "DROP INDEX IF EXISTS idx_items_type_name",
+        "DROP INDEX IF EXISTS idx_items_rarity_name",
+        "DROP INDEX IF EXISTS idx_items_location_name",
+        "DROP INDEX IF EXISTS idx_items_tier_name",
+        "CREATE INDEX IF NOT EXISTS idx_items_visible_name ON items (name) WHERE is_system = 0",
+        "CREATE INDEX IF NOT EXISTS idx_items_visible_type_name ON items (type, name) WHERE is_system = 0",
+        "CREATE INDEX IF NOT EXISTS idx_items_visible_rarity_name ON items (rarity, name) WHERE is_system = 0",
+        "CREATE INDEX IF NOT EXISTS idx_items_visible_location_name "
+        "ON items (drop_location, name) WHERE is_system = 0",
+        "CREATE INDEX IF NOT EXISTS idx_items_visible_tier_name ON items (tier, name) WHERE is_system = 0",
+        # แถวระบบมีไม่กี่แถว: index เล็ก ๆ ไว้หาแถวระบบโดยไม่ต้องไล่ทั้งตาราง
+        "CREATE INDEX IF NOT EXISTS idx_items_system_name ON items (name) WHERE is_system = 1",
+    ]),
+    # revision ที่เพิ่มขึ้นทุกครั้งที่มีการเขียน ใช้ตรวจการเปลี่ยนแปลงข้าม process (database.ChangeWatcher)
+    (7, "catalog revision counters", [
+        """
+        CREATE TABLE IF NOT EXISTS catalog_revision (
+            scope TEXT PRIMARY KEY,  -- 'catalog', 'items', 'master_data'
+            revision INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO catalog_revision (scope, revision) "
+        "VALUES ('catalog', 1), ('items', 1), ('master_data', 1)",
+        """
+        CREATE TRIGGER IF NOT EXISTS items_revision_ai AFTER INSERT ON items
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'items');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_revision_ad AFTER DELETE ON items
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'items');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_revision_au AFTER UPDATE ON items
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'items');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_revision_ai AFTER INSERT ON master_data
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'master_data');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_revision_ad AFTER DELETE ON master_data
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'master_data');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_revision_au AFTER UPDATE ON master_data
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'master_data');
+        END
+        """,
+    ]),
+    # ผลการบำรุงรักษาฐานข้อมูล (maintenance.py) — ไม่มี trigger revision การบันทึก log จึงไม่ทำให้ cache หมดอายุ
+    (8, "maintenance log", [
+        """
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,          -- 'optimize', 'analyze', 'incremental_vacuum', 'integrity_check'
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL,
+            reclaimed_bytes INTEGER DEFAULT 0,
+            revision INTEGER,            -- catalog revision ตอนที่รัน (ใช้นับปริมาณการเขียนหลังจากนั้น)
+            ok INTEGER NOT NULL DEFAULT 1,
+            detail TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_log_task ON maintenance_log (task, id)",
+    ]),
+    # บันทึกการเปลี่ยนแปลงสำหรับ export/sync แบบ delta (changes.py)
+    # UPDATE OF ระบุคอลัมน์ข้อมูลจริง: การเติม name_key โดย trigger ของ migration 3 จึงไม่ถูกบันทึกซ้ำ
+    (9, "change log and updated_at index", [
+        "CREATE INDEX IF NOT EXISTS idx_items_updated_at ON items (updated_at)",
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- ไม่ถูกใช้ซ้ำแม้แถวเก่าถูกลบ
+            entity TEXT NOT NULL,                   -- 'items', 'master_data'
+            entity_id INTEGER NOT NULL,
+            op TEXT NOT NULL,                       -- 'insert', 'update', 'delete'
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_change_log_entity ON change_log (entity, entity_id, seq)",
+        """
+        CREATE TRIGGER IF NOT EXISTS items_change_log_ai AFTER INSERT ON items
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('items', NEW.id, 'insert');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_change_log_au AFTER UPDATE
+        OF name, type, rarity, drop_location, tier, description, image_path ON items
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('items', NEW.id, 'update');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_change_log_ad AFTER DELETE ON items
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('items', OLD.id, 'delete');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_change_log_ai AFTER INSERT ON master_data
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('master_data', NEW.id, 'insert');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_change_log_au AFTER UPDATE OF category, value, color, sort_order ON master_data
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('master_data', NEW.id, 'update');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS master_data_change_log_ad AFTER DELETE ON master_data
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, op) VALUES ('master_data', OLD.id, 'delete');
+        END
+        """,
+        # ข้อมูลเดิมทั้งหมดเป็น 'insert' ผู้ที่ sync ตั้งแต่ seq 0 จึงได้ทั้งแคตตาล็อก
+        "INSERT INTO change_log (entity, entity_id, op) SELECT 'master_data', id, 'insert' FROM master_data ORDER BY id",
+        "INSERT INTO change_log (entity, entity_id, op) SELECT 'items', id, 'insert' FROM items ORDER BY id",
+        """
+        CREATE TABLE IF NOT EXISTS sync_cursor (
+            source TEXT PRIMARY KEY,   -- ไฟล์ต้นทางที่ sync มา
+            seq INTEGER NOT NULL,      -- seq ล่าสุดของต้นทางที่นำมาใช้แล้ว
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # normalize_name เรียงสระ/วรรณยุกต์ไทยแล้ว: คำนวณคีย์เดิมใหม่ (ชื่อที่กลายเป็นซ้ำได้คีย์ต่อท้าย id
+    # เหมือน migration 3) ต้องลบ unique index ก่อน เพราะระหว่าง UPDATE คีย์อาจชนกันชั่วคราว
+    (10, "recompute name_key with Thai mark ordering", [
+        "DROP INDEX IF EXISTS idx_items_name_key",
+        _backfill_name_key,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_items_name_key ON items (name_key)",
+    ]),
+    # trigger เดิมของ migration 7 ทำงานกับทุก UPDATE รวมถึงการเติม name_key ของ migration 3
+    # ทำให้ทุก INSERT นับ revision สองครั้ง — จำกัดเฉพาะคอลัมน์ข้อมูล (ชุดเดียวกับ items_change_log_au)
+    (11, "items revision trigger on data columns only", [
+        "DROP TRIGGER IF EXISTS items_revision_au",
+        """
+        CREATE TRIGGER IF NOT EXISTS items_revision_au AFTER UPDATE
+        OF name, type, rarity, drop_location, tier, description, image_path ON items
+        BEGIN
+            UPDATE catalog_revision SET revision = revision + 1 WHERE scope IN ('catalog', 'items');
+        END
+        """,
+    ]),
+    # รายการของ changes.sync_from ที่ยังชนกับแถวของปลายทาง (ถูกส่งซ้ำทุก sync จนกว่าจะสำเร็จ)
+    (12, "sync conflicts", [
+        """
+        CREATE TABLE IF NOT EXISTS sync_conflict (
+            source TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,       -- seq ของต้นทางที่ลองล่าสุด
+            error TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (source, entity, entity_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def get_schema_version(conn):
+    """เวอร์ชันล่าสุดที่รันแล้ว (0 ถ้ายังไม่เคยรัน)"""
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def _apply(conn, steps):
+    for step in steps:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(step)
+
+
+def run_migrations(conn):
+    """รัน migration ที่ยังไม่ได้รันตามลำดับ คืนค่ารายการเวอร์ชันที่รันในครั้งนี้"""
+    _ensure_version_table(conn)
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        # BEGIN IMMEDIATE แล้วอ่านเวอร์ชันซ้ำ กันไม่ให้หลาย process รัน migration เดียวกันซ้อนกัน
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+            if version <= current:
+                conn.rollback()
+                continue
+            _apply(conn, steps)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from datetime import datetime
+import time
 
 
 @dataclass
@@ -41,4 +42,56 @@ class Item:
             'tier': self.tier,
             'description': self.description,
             'image_path': self.image_path
-        }
\ No newline at end of file
+        }
+
+
+@dataclass
+class Page:
+    """ผลลัพธ์หนึ่งหน้าของการแบ่งหน้าแบบ keyset"""
+    rows: list = field(default_factory=list)
+    prev_cursor: Optional[tuple] = None
+    next_cursor: Optional[tuple] = None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+@dataclass
+class RowResult:
+    """ผลลัพธ์ของแต่ละแถวจาก execute_many"""
+    index: int
+    lastrowid: Optional[int] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+@dataclass
+class QueryRecord:
+    """สถิติของ statement หนึ่งครั้งใน ring buffer ของ database.py"""
+    shape: str
+    duration_ms: float
+    rows: int
+    call_site: str
+    page: Optional[str] = None
+    render: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class DeleteProgress:
+    """ความคืบหน้าของการลบทีละชุด (database.iter_delete_items / iter_delete_items_where)"""
+    deleted: int
+    total: int
+    chunks: int = 0
+
+    @property
+    def fraction(self):
+        return min(1.0, self.deleted / self.total) if self.total else 1.0
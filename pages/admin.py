@@ -1,7 +1,11 @@
+import os
+import sqlite3
+
 import streamlit as st
-from database import get_master_data, add_master_data, delete_master_data, update_master_data_color
+from backup import BACKUP_DIR, backup_database, list_backups
+from maintenance import TASKS, enable_incremental_vacuum, file_stats, get_last_results, get_maintenance_log, run_task
+from database import get_master_data, add_master_data, delete_master_data, update_master_data_color, get_facet_counts
 from utils import get_item_types, get_rarities, get_drop_locations, get_tiers
-from database import execute_query
 
 
 def manage_types():
@@ -25,11 +29,11 @@ def manage_types():
     with col1:
         types = get_item_types()
         if types:
+            usage = get_facet_counts('type', include_system=True)
             for t in types:
                 col_a, col_b = st.columns([3, 1])
                 with col_a:
-                    count = execute_query("SELECT COUNT(*) as c FROM items WHERE type = ?", (t,), fetch_one=True)
-                    item_count = count['c'] if count else 0
+                    item_count = usage.get(t, 0)
                     st.markdown(f"• **{t}** {f'({item_count} ชิ้น)' if item_count > 0 else ''}")
 
                 with col_b:
@@ -65,11 +69,11 @@ def manage_rarities():
     with col1:
         rarities = get_rarities()
         if rarities:
+            usage = get_facet_counts('rarity', include_system=True)
             for r, color in rarities:
                 col_a, col_b, col_c = st.columns([2, 1, 1])
                 with col_a:
-                    count = execute_query("SELECT COUNT(*) as c FROM items WHERE rarity = ?", (r,), fetch_one=True)
-                    item_count = count['c'] if count else 0
+                    item_count = usage.get(r, 0)
                     st.markdown(
                         f"<span style='color:{color};'>• **{r}**</span> {f'({item_count} ชิ้น)' if item_count > 0 else ''}",
                         unsafe_allow_html=True)
@@ -125,12 +129,11 @@ def manage_locations():
     with col1:
         locations = get_drop_locations()
         if locations:
+            usage = get_facet_counts('location', include_system=True)
             for loc in locations:
                 col_a, col_b = st.columns([3, 1])
                 with col_a:
-                    count = execute_query("SELECT COUNT(*) as c FROM items WHERE drop_location = ?", (loc,),
-                                          fetch_one=True)
-                    item_count = count['c'] if count else 0
+                    item_count = usage.get(loc, 0)
                     st.markdown(f"• **{loc}** {f'({item_count} ชิ้น)' if item_count > 0 else ''}")
 
                 with col_b:
@@ -165,11 +168,11 @@ def manage_tiers():
     with col1:
         tiers = get_tiers()
         if tiers:
+            usage = get_facet_counts('tier', include_system=True)
             for t in tiers:
                 col_a, col_b = st.columns([3, 1])
                 with col_a:
-                    count = execute_query("SELECT COUNT(*) as c FROM items WHERE tier = ?", (t,), fetch_one=True)
-                    item_count = count['c'] if count else 0
+                    item_count = usage.get(t, 0)
                     st.markdown(f"• **{t}** {f'({item_count} ชิ้น)' if item_count > 0 else ''}")
 
                 with col_b:
@@ -183,17 +186,112 @@ def manage_tiers():
             st.info("ยังไม่มีข้อมูล Tier")
 
 
+def manage_backups():
+    st.markdown("### 💾 สำรองข้อมูล")
+    st.caption("คัดลอกฐานข้อมูลขณะแอปทำงานด้วย online backup API — ผู้ใช้คนอื่นยังอ่าน/แก้ไขได้ตามปกติ")
+
+    col1, col2 = st.columns([2, 1])
+
+    with col2:
+        st.markdown("**➕ สำรองตอนนี้**")
+        with st.form("backup_form"):
+            compress = st.checkbox("บีบอัด (.gz)", value=True)
+            keep_last = st.number_input("เก็บไว้ล่าสุด (ไฟล์)", min_value=1, value=10, step=1)
+            submitted = st.form_submit_button("💾 สำรอง", use_container_width=True)
+
+        if submitted:
+            progress_bar = st.progress(0.0, text="กำลังสำรอง...")
+            try:
+                result = backup_database(compress=compress, keep_last=int(keep_last),
+                                         progress=lambda state: progress_bar.progress(
+                                             state.fraction,
+                                             text=f"{state.fraction:.0%} · {state.bytes_per_second / 1e6:.1f} MB/s"))
+            except (OSError, sqlite3.Error) as e:
+                st.error(f"⚠️ สำรองไม่สำเร็จ: {e}")
+            else:
+                st.success(f"✅ บันทึก {os.path.basename(result.path)} ({result.size / 1e6:.1f} MB) "
+                           f"ใน {result.seconds:.1f} วินาที ({result.bytes_per_second / 1e6:.1f} MB/s)")
+                if result.removed:
+                    st.info(f"ลบไฟล์เก่า {len(result.removed)} ไฟล์")
+
+    with col1:
+        backups = list_backups()
+        if backups:
+            for backup in backups:
+                st.markdown(f"• **{os.path.basename(backup.path)}** ({backup.size / 1e6:.1f} MB)")
+            # ปุ่มดาวน์โหลดต้องมีข้อมูลทั้งไฟล์ตอน render และทุกแท็บถูก render ทุก rerun
+            # จึงอ่านไฟล์เฉพาะหลังกด "เตรียมดาวน์โหลด" และเลิกถือไว้เมื่อดาวน์โหลดแล้ว
+            latest = backups[0]
+            if st.button("📦 เตรียมดาวน์โหลดไฟล์ล่าสุด"):
+                st.session_state.backup_download = latest.path
+            if st.session_state.get('backup_download') == latest.path:
+                with open(latest.path, 'rb') as f:
+                    st.download_button("⬇️ ดาวน์โหลดไฟล์ล่าสุด", f.read(), file_name=os.path.basename(latest.path),
+                                       on_click=lambda: st.session_state.pop('backup_download', None))
+        else:
+            st.info(f"ยังไม่มีไฟล์สำรองใน {BACKUP_DIR}/")
+
+
+def manage_maintenance():
+    st.markdown("### 🧹 บำรุงรักษาฐานข้อมูล")
+    st.caption("scheduler รันงานเหล่านี้เองเมื่อระบบว่าง หรือเมื่อมีการแก้ไขข้อมูลจำนวนมาก")
+
+    stats = file_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("ขนาดไฟล์", f"{stats['page_count'] * stats['page_size'] / 1e6:.1f} MB")
+    with col2:
+        st.metric("พื้นที่ว่างในไฟล์", f"{stats['freelist_count'] * stats['page_size'] / 1e6:.1f} MB",
+                  f"{stats['free_ratio']:.0%}", delta_color="off")
+    with col3:
+        st.metric("auto_vacuum", {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(stats['auto_vacuum']))
+
+    if stats['auto_vacuum'] != 2:
+        st.warning("ไฟล์นี้ยังคืนพื้นที่ทีละส่วนไม่ได้ — ต้อง VACUUM ทั้งไฟล์หนึ่งครั้ง (การแก้ไขจะรอจนเสร็จ)")
+        if st.button("🧹 เปิดใช้ incremental vacuum"):
+            with st.spinner("กำลัง VACUUM..."):
+                enable_incremental_vacuum()
+            st.rerun()
+
+    last_results = get_last_results()
+    st.markdown("**ผลล่าสุด**")
+    for task in TASKS:
+        row = last_results.get(task)
+        col_a, col_b = st.columns([4, 1])
+        with col_a:
+            if row is None:
+                st.markdown(f"• **{task}** — ยังไม่เคยรัน")
+            else:
+                status = "✅" if row['ok'] else "❌"
+                reclaimed = f", คืนพื้นที่ {row['reclaimed_bytes'] / 1e6:.1f} MB" if row['reclaimed_bytes'] else ""
+                st.markdown(f"• {status} **{task}** — {row['started_at']} ({row['duration_ms']:.0f} ms{reclaimed}) "
+                            f"{row['detail'] or ''}")
+        with col_b:
+            if st.button("▶️", key=f"run_maintenance_{task}"):
+                with st.spinner(f"กำลังรัน {task}..."):
+                    result = run_task(task)
+                if result.ok:
+                    st.success(f"✅ {task} เสร็จใน {result.duration_ms:.0f} ms")
+                else:
+                    st.error(f"⚠️ {task}: {result.detail}")
+
+    with st.expander("ประวัติ"):
+        st.dataframe([dict(row) for row in get_maintenance_log()], use_container_width=True, hide_index=True)
+
+
 def show():
     """หน้าหลัก ADMIN"""
     st.markdown("# ⚙️ ADMIN")
     st.markdown("### จัดการข้อมูลหลัก")
     st.markdown("---")
 
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "📦 จัดการประเภทไอเท็ม",
         "⭐ จัดการความหายาก",
         "📍 จัดการสถานที่ดรอป",
-        "📊 จัดการ Tier"
+        "📊 จัดการ Tier",
+        "💾 สำรองข้อมูล",
+        "🧹 บำรุงรักษา"
     ])
 
     with tab1:
@@ -208,6 +306,12 @@ def show():
     with tab4:
         manage_tiers()
 
+    with tab5:
+        manage_backups()
+
+    with tab6:
+        manage_maintenance()
+
     st.markdown("---")
     st.markdown("### 📊 สถิติข้อมูลหลัก")
 
@@ -1,6 +1,8 @@
+import sqlite3
 import streamlit as st
-from database import execute_query, check_duplicate_name
+from database import is_duplicate_name_error
 from models import Item
+from repository import SORT_NAME, ItemFilter, ItemRepository
 from utils import validate_item_data, get_rarity_color
 from utils import get_item_types, get_rarity_values, get_drop_locations, get_tiers
 import os
@@ -9,6 +11,37 @@ import pandas as pd
 import io
 import chardet  # เพิ่มสำหรับตรวจจับ encoding
 
+repository = ItemRepository()
+
+
+IMPORT_BATCH_SIZE = 1000  # จำนวนแถวต่อ transaction ตอนนำเข้า CSV
+SELECT_PAGE_SIZE = 60  # จำนวนไอเท็มต่อหน้าในรายการให้เลือกแก้ไข/ลบ
+
+
+def save_import_batch(batch, skip_duplicate):
+    """บันทึกชุดแถวจาก CSV ใน transaction เดียว
+
+    batch คือรายการ (เลขแถวในไฟล์, Item) คืนค่า (จำนวนที่บันทึก, ชื่อที่ข้ามเพราะซ้ำ, ข้อผิดพลาด)
+    """
+    if not batch:
+        return 0, [], []
+
+    saved = 0
+    duplicates = []
+    errors = []
+    results = repository.add_many([item for _, item in batch])
+    for (row_number, item), result in zip(batch, results):
+        if result.ok:
+            saved += 1
+        elif is_duplicate_name_error(result.error):
+            if skip_duplicate:
+                duplicates.append(item.name)
+            else:
+                errors.append(f"แถว {row_number}: {item.name} - ชื่อซ้ำกับไอเท็มที่มีอยู่แล้ว")
+        else:
+            errors.append(f"แถว {row_number}: {item.name} - {result.error}")
+    return saved, duplicates, errors
+
 
 # ===== ฟังก์ชัน Import CSV (แก้ไขให้รองรับ Excel) =====
 def import_csv_form():
@@ -159,12 +192,11 @@ def import_csv_form():
                     progress_bar = st.progress(0)
                     status_text = st.empty()
 
+                    # ตรวจสอบทุกแถวก่อน แล้วค่อยบันทึกเป็นชุด (หนึ่ง transaction ต่อชุด)
+                    pending = []
+
                     for index, row in df.iterrows():
                         try:
-                            progress = (index + 1) / len(df)
-                            progress_bar.progress(progress)
-                            status_text.text(f"กำลังนำเข้า: {index + 1}/{len(df)}")
-
                             # เอาช่องว่างออก
                             name = str(row['name']).strip()
                             item_type = str(row['type']).strip()
@@ -185,33 +217,38 @@ def import_csv_form():
                                 error_details.append(f"แถว {index + 2}: {name} - {', '.join(errors_list)}")
                                 continue
 
-                            # ตรวจสอบชื่อซ้ำ
-                            if skip_duplicate and check_duplicate_name(name):
-                                skip_count += 1
-                                duplicate_names.append(name)
-                                continue
-
-                            # บันทึกข้อมูล
-                            query = '''
-                                INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            '''
-                            execute_query(query, (
-                                name,
-                                item_type,
-                                rarity,
-                                drop_location,
-                                tier,
-                                description,
-                                "assets/images/placeholder.png"
-                            ))
-                            success_count += 1
+                            # ชื่อซ้ำ (ทั้งกับข้อมูลเดิมและภายในไฟล์) ตรวจโดย unique index ตอนบันทึก
+                            pending.append((index + 2, Item(
+                                name=name,
+                                type=item_type,
+                                rarity=rarity,
+                                drop_location=drop_location,
+                                tier=tier,
+                                description=description,
+                            )))
 
                         except Exception as e:
                             error_count += 1
                             error_details.append(
                                 f"แถว {index + 2}: {name if 'name' in locals() else 'unknown'} - {str(e)}")
 
+                    for start in range(0, len(pending), IMPORT_BATCH_SIZE):
+                        batch = pending[start:start + IMPORT_BATCH_SIZE]
+                        try:
+                            saved, duplicates, batch_errors = save_import_batch(batch, skip_duplicate)
+                        except Exception as e:
+                            saved, duplicates = 0, []
+                            batch_errors = [f"แถว {row_number}: {item.name} - {str(e)}" for row_number, item in batch]
+                        success_count += saved
+                        skip_count += len(duplicates)
+                        duplicate_names.extend(duplicates)
+                        error_count += len(batch_errors)
+                        error_details.extend(batch_errors)
+
+                        done = start + len(batch)
+                        progress_bar.progress(done / len(pending))
+                        status_text.text(f"กำลังนำเข้า: {done}/{len(pending)}")
+
                     progress_bar.empty()
                     status_text.empty()
 
@@ -328,7 +365,7 @@ def add_item_form():
                 for error in errors:
                     st.error(error)
             else:
-                if check_duplicate_name(name):
+                if repository.name_exists(name):
                     st.error(f"⚠️ ไอเท็มชื่อ '{name}' มีอยู่แล้ว!")
                 else:
                     image_path = "assets/images/placeholder.png"
@@ -339,14 +376,17 @@ def add_item_form():
                         with open(image_path, "wb") as f:
                             f.write(image_file.getbuffer())
 
-                    query = '''
-                        INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    '''
-                    execute_query(query,
-                                  (name.strip(), item_type, rarity, drop_location, tier, description, image_path))
-                    st.session_state.add_success_message = f"✅ เพิ่มไอเท็ม '{name}' เรียบร้อย!"
-                    st.rerun()
+                    try:
+                        repository.add(Item(name=name, type=item_type, rarity=rarity, drop_location=drop_location,
+                                            tier=tier, description=description, image_path=image_path))
+                    except sqlite3.IntegrityError as e:
+                        if not is_duplicate_name_error(e):
+                            raise
+                        # มีคนบันทึกชื่อเดียวกันไปก่อนหน้าเพียงเสี้ยววินาที
+                        st.error(f"⚠️ ไอเท็มชื่อ '{name}' มีอยู่แล้ว!")
+                    else:
+                        st.session_state.add_success_message = f"✅ เพิ่มไอเท็ม '{name}' เรียบร้อย!"
+                        st.rerun()
 
 
 def edit_item_form(item):
@@ -437,7 +477,7 @@ def edit_item_form(item):
                 for error in errors:
                     st.error(error)
             else:
-                if name.strip() != item.name and check_duplicate_name(name, exclude_id=item.id):
+                if name.strip() != item.name and repository.name_exists(name, exclude_id=item.id):
                     st.error(f"⚠️ ไอเท็มชื่อ '{name}' มีอยู่แล้ว!")
                 else:
                     image_path = item.image_path
@@ -448,22 +488,23 @@ def edit_item_form(item):
                         with open(image_path, "wb") as f:
                             f.write(image_file.getbuffer())
 
-                    query = '''
-                        UPDATE items 
-                        SET name = ?, type = ?, rarity = ?, drop_location = ?, 
-                            tier = ?, description = ?, image_path = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    '''
-                    execute_query(query, (name.strip(), item_type, rarity, drop_location, tier, description, image_path,
-                                          item.id))
-                    st.session_state.edit_success_message = f"✅ อัปเดต '{name}' เรียบร้อย!"
-                    st.rerun()
+                    try:
+                        repository.update(Item(id=item.id, name=name, type=item_type, rarity=rarity,
+                                               drop_location=drop_location, tier=tier, description=description,
+                                               image_path=image_path))
+                    except sqlite3.IntegrityError as e:
+                        if not is_duplicate_name_error(e):
+                            raise
+                        st.error(f"⚠️ ไอเท็มชื่อ '{name}' มีอยู่แล้ว!")
+                    else:
+                        st.session_state.edit_success_message = f"✅ อัปเดต '{name}' เรียบร้อย!"
+                        st.rerun()
 
         if delete_btn:
             st.warning(f"ต้องการลบ '{item.name}'?")
             confirm = st.checkbox("✓ ยืนยันการลบ", key=f"confirm_del_{item.id}")
             if confirm:
-                execute_query("DELETE FROM items WHERE id = ?", (item.id,))
+                repository.delete(item.id)
                 st.success(f"🗑️ ลบ '{item.name}' เรียบร้อย!")
                 st.balloons()
                 st.rerun()
@@ -473,58 +514,99 @@ def edit_item_form(item):
 
 
 def manage_items_list():
-    items = execute_query("SELECT * FROM items WHERE name NOT LIKE '[%]%' ORDER BY name")
+    # ไม่โหลดทุกไอเท็มเข้า selectbox: ค้นด้วยชื่อแล้วเลือกจากหน้าแรกของผลลัพธ์
+    search = st.text_input("🔎 ค้นหาไอเท็มที่ต้องการแก้ไข", key="edit_item_search")
+    item_filter = ItemFilter.create(search=search, names_only=True, sort=SORT_NAME, page_size=SELECT_PAGE_SIZE)
+    items = repository.list_page(item_filter).rows
 
     if not items:
-        st.info("ℹ️ ยังไม่มีไอเท็มในระบบ")
+        st.info("ℹ️ ไม่พบไอเท็ม" if item_filter.search else "ℹ️ ยังไม่มีไอเท็มในระบบ")
         return
 
-    item_options = {f"{item['name']} ({item['rarity']})": item['id'] for item in items}
+    item_options = {f"{item.name} ({item.rarity})": item.id for item in items}
     selected_display = st.selectbox("เลือกไอเท็มที่ต้องการแก้ไข", list(item_options.keys()), key="select_edit_item")
+    if len(items) == SELECT_PAGE_SIZE:
+        st.caption(f"แสดง {SELECT_PAGE_SIZE} รายการแรก พิมพ์คำค้นเพื่อหาไอเท็มอื่น")
 
     if selected_display:
         selected_id = item_options[selected_display]
-        item_data = execute_query("SELECT * FROM items WHERE id = ?", (selected_id,), fetch_one=True)
+        item = repository.get(selected_id)
 
-        if item_data:
-            item = Item.from_dict(dict(item_data))
+        if item:
             edit_item_form(item)
 
 
+def clear_bulk_checkboxes(items):
+    """ล้าง state ของ checkbox ในหน้าปัจจุบัน ให้วาดใหม่ตาม bulk_del_selected"""
+    for item in items:
+        st.session_state.pop(f"bulk_del_{item.id}", None)
+
+
+def show_bulk_page_controls(page, page_number):
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ ก่อนหน้า", key="bulk_prev_page", disabled=not page.has_prev, use_container_width=True):
+            st.session_state.bulk_del_page = {'cursor': page.prev_cursor, 'backward': True,
+                                              'number': max(page_number - 1, 1)}
+            st.rerun()
+    with col_info:
+        st.markdown(f"<p style='text-align:center;'>หน้า {page_number}</p>", unsafe_allow_html=True)
+    with col_next:
+        if st.button("ถัดไป ▶", key="bulk_next_page", disabled=not page.has_next, use_container_width=True):
+            st.session_state.bulk_del_page = {'cursor': page.next_cursor, 'backward': False,
+                                              'number': page_number + 1}
+            st.rerun()
+
+
 def bulk_delete_items():
     st.markdown("### 🗑️ ลบหลายรายการ")
 
-    items = execute_query("SELECT * FROM items WHERE name NOT LIKE '[%]%' ORDER BY name")
+    total = repository.count()
 
-    if not items:
+    if not total:
         st.info("ℹ️ ยังไม่มีไอเท็ม")
         return
 
-    total = len(items)
     st.metric("ไอเท็มทั้งหมด", f"{total} ชิ้น")
 
+    # id ที่เลือกเก็บใน session_state ข้ามหน้า — วาด checkbox เฉพาะหน้าที่แสดงอยู่
+    selected = st.session_state.setdefault('bulk_del_selected', set())
+
+    search = st.text_input("🔎 ค้นหาชื่อ", key="bulk_del_search")
+    item_filter = ItemFilter.create(search=search, names_only=True, sort=SORT_NAME, page_size=SELECT_PAGE_SIZE)
+    if st.session_state.get('bulk_del_filter') != item_filter:
+        st.session_state.bulk_del_filter = item_filter
+        st.session_state.bulk_del_page = {'cursor': None, 'backward': False, 'number': 1}
+    page_state = st.session_state.bulk_del_page
+    page = repository.list_page(item_filter, cursor=page_state['cursor'], backward=page_state['backward'])
+
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("✅ เลือกทั้งหมด", use_container_width=True):
-            for item in items:
-                st.session_state[f"bulk_del_{item['id']}"] = True
+        if st.button("✅ เลือกทั้งหน้า", use_container_width=True):
+            selected.update(item.id for item in page.rows)
+            clear_bulk_checkboxes(page.rows)
             st.rerun()
     with col2:
         if st.button("❌ ยกเลิกทั้งหมด", use_container_width=True):
-            for item in items:
-                if f"bulk_del_{item['id']}" in st.session_state:
-                    del st.session_state[f"bulk_del_{item['id']}"]
+            selected.clear()
+            clear_bulk_checkboxes(page.rows)
             st.rerun()
 
+    if not page.rows:
+        st.info("ℹ️ ไม่พบไอเท็ม")
+
     cols = st.columns(3)
-    selected = []
 
-    for idx, item in enumerate(items):
+    for idx, item in enumerate(page.rows):
         with cols[idx % 3]:
-            if st.checkbox(f"{item['name']}", key=f"bulk_del_{item['id']}"):
-                selected.append(item['id'])
-                st.markdown(f"<small style='color:{get_rarity_color(item['rarity'])};'>{item['rarity']}</small>",
+            if st.checkbox(f"{item.name}", value=item.id in selected, key=f"bulk_del_{item.id}"):
+                selected.add(item.id)
+                st.markdown(f"<small style='color:{get_rarity_color(item.rarity)};'>{item.rarity}</small>",
                             unsafe_allow_html=True)
+            else:
+                selected.discard(item.id)
+
+    show_bulk_page_controls(page, page_state['number'])
 
     if selected:
         st.warning(f"เลือก {len(selected)} รายการ")
@@ -535,34 +617,43 @@ def bulk_delete_items():
                 st.warning("⚠️ กดยืนยันอีกครั้ง!")
                 st.rerun()
             else:
-                placeholders = ','.join(['?'] * len(selected))
-                execute_query(f"DELETE FROM items WHERE id IN ({placeholders})", selected)
+                progress_bar = st.progress(0.0, text="กำลังลบ...")
+                deleted = repository.delete_many(selected, progress=lambda state: progress_bar.progress(
+                    state.fraction, text=f"ลบแล้ว {state.deleted:,}/{state.total:,} รายการ"))
                 st.session_state.pop('confirm_bulk_delete', None)
-                for item_id in selected:
-                    if f"bulk_del_{item_id}" in st.session_state:
-                        del st.session_state[f"bulk_del_{item_id}"]
-                st.success(f"✅ ลบ {len(selected)} รายการเรียบร้อย!")
+                selected.clear()
+                clear_bulk_checkboxes(page.rows)
+                st.session_state.bulk_del_page = {'cursor': None, 'backward': False, 'number': 1}
+                st.success(f"✅ ลบ {deleted} รายการเรียบร้อย!")
                 st.balloons()
                 st.rerun()
 
     st.markdown("---")
     st.markdown("#### ⚠️ ลบทั้งหมด")
 
+    # ว่าง = ลบทุกไอเท็ม, มีคำค้น = ลบเฉพาะไอเท็มที่ชื่อตรงกับคำค้น
+    delete_search = st.text_input("ลบเฉพาะชื่อที่ตรงกับคำค้น (เว้นว่างเพื่อลบทั้งหมด)",
+                                  key="delete_all_search").strip()
+    delete_filter = ItemFilter.create(search=delete_search, names_only=True)
+    matching = repository.count(delete_filter) if delete_search else total
+
     col1, col2 = st.columns([1, 3])
     with col1:
         delete_all_confirm = st.checkbox("ฉันต้องการลบทั้งหมด", key="delete_all_confirm")
 
     if delete_all_confirm:
-        if st.button("🗑️ ลบทั้งหมด", use_container_width=True):
+        if st.button(f"🗑️ ลบ {matching:,} รายการ", use_container_width=True, disabled=not matching):
             if 'confirm_delete_all' not in st.session_state:
                 st.session_state.confirm_delete_all = True
                 st.error("⚠️⚠️ กดยืนยันอีกครั้ง!")
                 st.rerun()
             else:
-                execute_query("DELETE FROM items WHERE name NOT LIKE '[%]%'")
+                progress_bar = st.progress(0.0, text="กำลังลบ...")
+                deleted = repository.delete_matching(delete_filter, progress=lambda state: progress_bar.progress(
+                    state.fraction, text=f"ลบแล้ว {state.deleted:,}/{state.total:,} รายการ"))
                 st.session_state.pop('confirm_delete_all', None)
                 st.session_state['delete_all_confirm'] = False
-                st.success(f"✅ ลบทั้งหมด {total} รายการ!")
+                st.success(f"✅ ลบทั้งหมด {deleted:,} รายการ!")
                 st.balloons()
                 st.rerun()
 
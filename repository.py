@@ -0,0 +1,246 @@
+"""ชั้นเข้าถึงข้อมูลไอเท็ม (ItemRepository)
+
+ทุกหน้าเรียกข้อมูลไอเท็มผ่านโมดูลนี้ แทนการต่อ SQL เองในแต่ละหน้า
+ตัวกรองแบบหลายค่าส่งเป็น JSON array ผ่าน json_each(?) ทำให้ SQL มีรูปแบบเดียว
+ต่อชุดตัวกรองที่เลือก ไม่ว่าจะเลือกกี่ค่า — statement cache ของ sqlite3 จึงใช้ซ้ำได้
+"""
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+from database import (
+    PAGE_SIZE, VISIBLE_CONDITION, execute_query, execute_many, iter_query, check_duplicate_name, count_items,
+    iter_delete_items, iter_delete_items_where, list_items_page, get_item_stats, search_condition,
+    search_items_page, get_catalog_revision, get_db_path, read_snapshot
+)
+from models import Item, Page
+
+# ตัวกรองหลายค่า → คอลัมน์ในตาราง items (เรียงตามลำดับที่ใช้สร้าง SQL)
+FILTER_COLUMNS = (
+    ('types', 'type'),
+    ('rarities', 'rarity'),
+    ('locations', 'drop_location'),
+    ('tiers', 'tier'),
+)
+
+# ตัวกรองหลายค่า → dimension ในตาราง item_stats
+STATS_DIMENSIONS = {'types': 'type', 'rarities': 'rarity', 'locations': 'location', 'tiers': 'tier'}
+
+SORT_NAME = 'name'
+SORT_RELEVANCE = 'relevance'
+
+
+@dataclass(frozen=True)
+class ItemFilter:
+    """ตัวกรองไอเท็ม (ใช้เป็น key ได้ เพราะเป็น frozen dataclass)"""
+    search: str = ""
+    names_only: bool = False
+    types: frozenset = frozenset()
+    rarities: frozenset = frozenset()
+    locations: frozenset = frozenset()
+    tiers: frozenset = frozenset()
+    include_system: bool = False
+    sort: str = SORT_RELEVANCE
+    page_size: int = PAGE_SIZE
+
+    @staticmethod
+    def create(search="", names_only=False, types=(), rarities=(), locations=(), tiers=(),
+               include_system=False, sort=SORT_RELEVANCE, page_size=PAGE_SIZE):
+        """สร้างตัวกรองจากค่าที่ได้จาก widget (list/tuple) พร้อมตัดช่องว่างของคำค้น"""
+        return ItemFilter(
+            search=(search or "").strip(),
+            names_only=names_only,
+            types=frozenset(types),
+            rarities=frozenset(rarities),
+            locations=frozenset(locations),
+            tiers=frozenset(tiers),
+            include_system=include_system,
+            sort=sort,
+            page_size=page_size,
+        )
+
+    @property
+    def shape(self):
+        """ตัวกรองที่ถูกใช้งาน (กำหนดรูปแบบของ SQL)"""
+        active = tuple(attr for attr, _ in FILTER_COLUMNS if getattr(self, attr))
+        return (self.include_system,) + active
+
+
+@lru_cache(maxsize=64)
+def _compile_conditions(shape):
+    """สร้างเงื่อนไข SQL หนึ่งครั้งต่อรูปแบบตัวกรอง"""
+    include_system, *active = shape
+    columns = dict(FILTER_COLUMNS)
+    conditions = [] if include_system else [VISIBLE_CONDITION]
+    for attr in active:
+        conditions.append(f"{columns[attr]} IN (SELECT value FROM json_each(?))")
+    return tuple(conditions)
+
+
+def _compile(item_filter):
+    conditions = _compile_conditions(item_filter.shape)
+    params = tuple(
+        json.dumps(sorted(getattr(item_filter, attr)), ensure_ascii=False)
+        for attr, _ in FILTER_COLUMNS if getattr(item_filter, attr)
+    )
+    return conditions, params
+
+
+def _count_from_stats(item_filter, active):
+    """จำนวนจาก item_stats สำหรับตัวกรองไม่เกินหนึ่งมิติ (ไม่มีคำค้น ไม่รวมแถวระบบ)"""
+    if not active:
+        row = execute_query("SELECT count FROM item_stats WHERE dimension = 'total'", fetch_one=True)
+        return row['count'] if row else 0
+    attr, = active
+    row = execute_query(
+        "SELECT COALESCE(SUM(count), 0) AS count FROM item_stats "
+        "WHERE dimension = ? AND value IN (SELECT value FROM json_each(?))",
+        (STATS_DIMENSIONS[attr], json.dumps(sorted(getattr(item_filter, attr)), ensure_ascii=False)),
+        fetch_one=True)
+    return row['count']
+
+
+@lru_cache(maxsize=256)
+def _cached_count(path, revision, conditions, params, search, names_only):
+    # path และ revision อยู่ใน key: เขียนไอเท็มเมื่อไร (จาก process ใดก็ตาม) ค่าเดิมก็ไม่ถูกใช้อีก
+    # นับจากไฟล์จริงเสมอ ให้ตรงกับ revision ที่อ่านจากไฟล์ (ไม่ใช่ snapshot ที่อาจเก่ากว่า)
+    with read_snapshot(False):
+        return count_items(conditions, params, search, names_only)
+
+
+def _to_item(row):
+    return Item.from_dict(dict(row)) if row else None
+
+
+class ItemRepository:
+    """จุดเดียวที่หน้าเว็บใช้อ่าน/เขียนตาราง items"""
+
+    # ===== อ่านข้อมูล =====
+
+    def get(self, item_id):
+        row = execute_query("SELECT * FROM items WHERE id = ?", (item_id,), fetch_one=True)
+        return _to_item(row)
+
+    def count(self, item_filter=ItemFilter()):
+        """จำนวนไอเท็มที่ตรงตัวกรอง (หน้าเว็บเรียกทุก rerun)
+
+        ไม่มีคำค้นและกรองไม่เกินหนึ่งมิติ → อ่านจาก item_stats ที่ trigger ดูแลให้ตรงเสมอ
+        นอกนั้นนับจริงครั้งเดียวต่อ revision ของ items แล้วจำผลไว้
+        """
+        active = item_filter.shape[1:]
+        if not item_filter.search and not item_filter.include_system and len(active) <= 1:
+            return _count_from_stats(item_filter, active)
+        conditions, params = _compile(item_filter)
+        return _cached_count(get_db_path(), get_catalog_revision('items'), conditions, params,
+                             item_filter.search, item_filter.names_only)
+
+    def list_page(self, item_filter=ItemFilter(), cursor=None, backward=False):
+        """ไอเท็มหนึ่งหน้าตามตัวกรอง (Page.rows เป็น Item)
+
+        มีคำค้นและ sort=relevance → เรียงตามความเกี่ยวข้อง, นอกนั้นเรียงตามชื่อ
+        """
+        conditions, params = _compile(item_filter)
+        if item_filter.search and item_filter.sort == SORT_RELEVANCE:
+            page = search_items_page(item_filter.search, conditions, params, cursor=cursor,
+                                     page_size=item_filter.page_size, backward=backward,
+                                     names_only=item_filter.names_only)
+        else:
+            conditions, params = self._with_search(item_filter, conditions, params)
+            page = list_items_page(conditions, params, cursor=cursor,
+                                   page_size=item_filter.page_size, backward=backward)
+        return Page(rows=[_to_item(row) for row in page.rows],
+                    prev_cursor=page.prev_cursor, next_cursor=page.next_cursor)
+
+    def list_all(self, item_filter=ItemFilter()):
+        """ไอเท็มทั้งหมดที่ตรงตัวกรอง เรียงตามชื่อ"""
+        conditions, params = self._with_search(item_filter, *_compile(item_filter))
+        where = " AND ".join(conditions) or "1=1"
+        rows = execute_query(f"SELECT * FROM items WHERE {where} ORDER BY name, id", params)
+        return [_to_item(row) for row in rows]
+
+    def iter_all(self, item_filter=ItemFilter(), batch_size=None):
+        """เหมือน list_all แต่อ่านทีละแถว (หรือทีละชุด) จาก cursor — ใช้กับ export/ตรวจข้อมูลทั้งตาราง"""
+        conditions, params = self._with_search(item_filter, *_compile(item_filter))
+        where = " AND ".join(conditions) or "1=1"
+        query = f"SELECT * FROM items WHERE {where} ORDER BY name, id"
+        if batch_size:
+            for rows in iter_query(query, params, batch_size=batch_size):
+                yield [_to_item(row) for row in rows]
+        else:
+            for row in iter_query(query, params):
+                yield _to_item(row)
+
+    @staticmethod
+    def _with_search(item_filter, conditions, params):
+        if not item_filter.search:
+            return conditions, params
+        condition, search_params = search_condition(item_filter.search, item_filter.names_only)
+        return conditions + (condition,), params + search_params
+
+    def stats(self):
+        """จำนวนไอเท็มทั้งหมดและแยกตามหมวดหมู่ จากตาราง item_stats (ดู database.get_item_stats)"""
+        return get_item_stats()
+
+    def name_exists(self, name, exclude_id=None):
+        return check_duplicate_name(name, exclude_id)
+
+    # ===== เขียนข้อมูล =====
+
+    def add(self, item):
+        """เพิ่มไอเท็ม คืนค่า id ใหม่ (ชื่อซ้ำจะได้ sqlite3.IntegrityError)"""
+        query = '''
+            INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        return execute_query(query, (
+            item.name.strip(), item.type, item.rarity, item.drop_location,
+            item.tier, item.description, item.image_path
+        ))
+
+    def add_many(self, items):
+        """เพิ่มหลายไอเท็มใน transaction เดียว คืนค่า RowResult ต่อไอเท็ม (ชื่อซ้ำ → error)"""
+        query = '''
+            INSERT INTO items (name, type, rarity, drop_location, tier, description, image_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        return execute_many(query, [(
+            item.name.strip(), item.type, item.rarity, item.drop_location,
+            item.tier, item.description, item.image_path
+        ) for item in items])
+
+    def update(self, item):
+        query = '''
+            UPDATE items
+            SET name = ?, type = ?, rarity = ?, drop_location = ?,
+                tier = ?, description = ?, image_path = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        '''
+        execute_query(query, (
+            item.name.strip(), item.type, item.rarity, item.drop_location,
+            item.tier, item.description, item.image_path, item.id
+        ))
+
+    def delete(self, item_id):
+        execute_query("DELETE FROM items WHERE id = ?", (item_id,))
+
+    def delete_many(self, item_ids, progress=None):
+        """ลบตาม id ทีละชุด (ดู database.iter_delete_items) คืนค่าจำนวนที่ลบ
+
+        progress(DeleteProgress) ถูกเรียกหลังแต่ละชุด เช่นใช้อัปเดต st.progress
+        """
+        return self._run_delete(iter_delete_items(item_ids), progress)
+
+    def delete_matching(self, item_filter=ItemFilter(), progress=None):
+        """ลบทุกไอเท็มที่ตรงตัวกรองทีละชุด (ค่าเริ่มต้น: ทุกไอเท็มที่ไม่ใช่แถวระบบ) คืนค่าจำนวนที่ลบ"""
+        conditions, params = _compile(item_filter)
+        return self._run_delete(iter_delete_items_where(conditions, params, item_filter.search,
+                                                        item_filter.names_only), progress)
+
+    @staticmethod
+    def _run_delete(chunks, progress):
+        deleted = 0
+        for state in chunks:
+            deleted = state.deleted
+            if progress is not None:
+                progress(state)
+        return deleted
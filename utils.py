@@ -1,8 +1,9 @@
 import os
 import base64
+import threading
 from PIL import Image
 import streamlit as st
-from database import execute_query, get_master_data
+from database import execute_query, get_master_data, get_master_data_version, get_db_path
 
 def load_css():
     st.markdown("""
@@ -68,33 +69,62 @@ def validate_item_data(name, type_, rarity, drop_location, tier):
         errors.append("กรุณาเลือก Tier")
     return errors
 
+# ===== Cache ของ Master Data =====
+# ใช้ร่วมกันทั้ง process (ทุก session) และโหลดใหม่เมื่อเวอร์ชันใน database.py เปลี่ยน
+
+_master_cache = {}
+_master_cache_lock = threading.Lock()
+
+
+def _load_master_data(category):
+    """คืนค่า {'values': tuple, 'colors': dict} ของหมวดหมู่ จาก cache ถ้ายังเป็นเวอร์ชันล่าสุด"""
+    key = (get_db_path(), category)
+    # อ่านเวอร์ชันก่อน query: ถ้ามีการแก้ไขระหว่างโหลด เวอร์ชันที่บันทึกจะเก่ากว่าและถูกโหลดใหม่รอบถัดไป
+    version = get_master_data_version()
+    entry = _master_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    rows = get_master_data(category) or []
+    data = {
+        'values': tuple(row['value'] for row in rows),
+        'colors': {row['value']: row['color'] for row in rows},
+    }
+    with _master_cache_lock:
+        current = _master_cache.get(key)
+        if current is None or current[0] <= version:
+            _master_cache[key] = (version, data)
+    return data
+
+
+def clear_master_data_cache():
+    with _master_cache_lock:
+        _master_cache.clear()
+
+
 # ===== ฟังก์ชันดึงข้อมูลจาก Master Data =====
+# คืนค่าเป็น list ใหม่ทุกครั้ง เพราะบางหน้าต่อท้ายค่าเข้าไปใน list ที่ได้
 
 def get_item_types():
     """ดึงรายการประเภทไอเท็มจาก master_data"""
-    data = get_master_data('type')
-    return [row['value'] for row in data] if data else []
+    return list(_load_master_data('type')['values'])
 
 def get_rarities():
     """ดึงรายการความหายากจาก master_data พร้อมสี"""
-    data = get_master_data('rarity')
-    if data:
-        return [(row['value'], row['color']) for row in data]
-    return []
+    data = _load_master_data('rarity')
+    return [(value, data['colors'][value]) for value in data['values']]
 
 def get_rarity_values():
     """ดึงเฉพาะค่าความหายาก"""
-    return [r[0] for r in get_rarities()]
+    return list(_load_master_data('rarity')['values'])
 
 def get_drop_locations():
     """ดึงรายการสถานที่ดรอปจาก master_data"""
-    data = get_master_data('location')
-    return [row['value'] for row in data] if data else []
+    return list(_load_master_data('location')['values'])
 
 def get_tiers():
     """ดึงรายการ Tier จาก master_data"""
-    data = get_master_data('tier')
-    return [row['value'] for row in data] if data else []
+    return list(_load_master_data('tier')['values'])
 
 def get_filter_options():
     """ดึงข้อมูลสำหรับหน้า VIEW ITEMS"""
@@ -102,11 +132,7 @@ def get_filter_options():
 
 def get_rarity_color(rarity):
     """ดึงสีของความหายาก"""
-    rarities = get_rarities()
-    for r, color in rarities:
-        if r == rarity:
-            return color
-    return "#808080"
+    return _load_master_data('rarity')['colors'].get(rarity, "#808080")
 
 def get_rarity_icon(rarity):
     icons = {
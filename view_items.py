@@ -1,16 +1,19 @@
 import streamlit as st
-from database import execute_query
-from models import Item
+from dataclasses import replace
+from repository import ItemFilter, ItemRepository
 from utils import get_filter_options, get_image_base64, get_rarity_color, get_rarity_icon
 
+PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
+
+repository = ItemRepository()
+
 
 def show_card_view(items_data):
     if not items_data:
         return
 
     cols = st.columns(3)
-    for idx, item_data in enumerate(items_data):
-        item = Item.from_dict(dict(item_data))
+    for idx, item in enumerate(items_data):
         with cols[idx % 3]:
             img_base64 = get_image_base64(item.image_path)
             if img_base64:
@@ -40,8 +43,7 @@ def show_table_view(items_data):
         return
 
     table_data = []
-    for item_data in items_data:
-        item = Item.from_dict(dict(item_data))
+    for item in items_data:
         table_data.append({
             "ชื่อ": item.name,
             "ประเภท": item.type,
@@ -71,6 +73,23 @@ def show_item_detail(item):
             st.markdown(f">{item.description}")
 
 
+def show_page_controls(page, page_number, page_count):
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ ก่อนหน้า", key="items_prev_page", disabled=not page.has_prev, use_container_width=True):
+            st.session_state.items_page = {'cursor': page.prev_cursor, 'backward': True,
+                                           'number': max(page_number - 1, 1)}
+            st.rerun()
+    with col_info:
+        st.markdown(f"<p style='text-align:center;'>หน้า {page_number} / {page_count}</p>",
+                    unsafe_allow_html=True)
+    with col_next:
+        if st.button("ถัดไป ▶", key="items_next_page", disabled=not page.has_next, use_container_width=True):
+            st.session_state.items_page = {'cursor': page.next_cursor, 'backward': False,
+                                           'number': page_number + 1}
+            st.rerun()
+
+
 def show():
     """หน้าหลัก VIEW ITEMS"""
     st.markdown("# 🔍 ค้นหาไอเท็ม")
@@ -84,51 +103,50 @@ def show():
         selected_location = st.multiselect("สถานที่ดรอป", locations, key="filter_location")
         selected_tier = st.multiselect("Tier", tiers, key="filter_tier")
 
-    search_query = st.text_input("🔎 ค้นหาชื่อไอเท็ม", placeholder="พิมพ์ชื่อไอเท็ม...")
-
-    query = "SELECT * FROM items WHERE 1=1 AND name NOT LIKE '[%]%'"
-    params = []
-
-    if search_query:
-        query += " AND name LIKE ?"
-        params.append(f"%{search_query}%")
-
-    if selected_type:
-        placeholders = ','.join(['?'] * len(selected_type))
-        query += f" AND type IN ({placeholders})"
-        params.extend(selected_type)
-
-    if selected_rarity:
-        placeholders = ','.join(['?'] * len(selected_rarity))
-        query += f" AND rarity IN ({placeholders})"
-        params.extend(selected_rarity)
-
-    if selected_location:
-        placeholders = ','.join(['?'] * len(selected_location))
-        query += f" AND drop_location IN ({placeholders})"
-        params.extend(selected_location)
-
-    if selected_tier:
-        placeholders = ','.join(['?'] * len(selected_tier))
-        query += f" AND tier IN ({placeholders})"
-        params.extend(selected_tier)
-
-    query += " ORDER BY name"
-
-    items_data = execute_query(query, params)
-
-    if not items_data:
+    col_search, col_scope = st.columns([4, 1])
+    with col_search:
+        search_query = st.text_input("🔎 ค้นหาไอเท็ม", placeholder="พิมพ์ชื่อหรือคำในคำอธิบาย...")
+    with col_scope:
+        names_only = st.checkbox("ค้นเฉพาะชื่อ", key="search_names_only")
+
+    item_filter = ItemFilter.create(
+        search=search_query,
+        names_only=names_only,
+        types=selected_type,
+        rarities=selected_rarity,
+        locations=selected_location,
+        tiers=selected_tier,
+    )
+
+    total = repository.count(item_filter)
+    if total == 0:
         st.warning("😢 ไม่พบไอเท็มที่ค้นหา")
-    else:
-        st.success(f"พบ {len(items_data)} รายการ")
+        return
 
+    st.success(f"พบ {total} รายการ")
+
+    col_mode, col_size = st.columns([3, 1])
+    with col_mode:
         view_mode = st.radio(
             "รูปแบบการแสดงผล",
             ["📱 การ์ด", "📊 ตาราง"],
             horizontal=True
         )
+    with col_size:
+        page_size = st.selectbox("จำนวนต่อหน้า", PAGE_SIZE_OPTIONS, index=1, key="items_page_size")
+
+    # เปลี่ยนตัวกรอง/คำค้น/จำนวนต่อหน้า → กลับไปหน้าแรก
+    item_filter = replace(item_filter, page_size=page_size)
+    if st.session_state.get('items_page_filter') != item_filter:
+        st.session_state.items_page_filter = item_filter
+        st.session_state.items_page = {'cursor': None, 'backward': False, 'number': 1}
+    page_state = st.session_state.items_page
+
+    page = repository.list_page(item_filter, cursor=page_state['cursor'], backward=page_state['backward'])
+
+    if view_mode == "📊 ตาราง":
+        show_table_view(page.rows)
+    else:
+        show_card_view(page.rows)
 
-        if view_mode == "📊 ตาราง":
-            show_table_view(items_data)
-        else:
-            show_card_view(items_data)
\ No newline at end of file
+    show_page_controls(page, page_state['number'], -(-total // page_size))
\ No newline at end of file